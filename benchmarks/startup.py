@@ -0,0 +1,102 @@
+"""
+Startup-time benchmark: spawn the service with uvicorn and measure the
+time from process start (interpreter start, ``import main``, app
+construction and lifespan) to the first successful ``/readyz`` response.
+
+    python -m benchmarks.startup [--runs 5] [--database-url URL]
+
+Each mode runs against an already-initialised database, which is the
+scale-out case: a new replica joining an existing deployment.
+"""
+import argparse
+import os
+from pathlib import Path
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _time_to_ready(env: dict[str, str], timeout: float = 30.0) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/readyz"
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise TimeoutError("service did not become ready")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{tmp}/bench.db"
+        base_env = {
+            **os.environ,
+            "BASIC_AUTH_PASSWORD": os.environ.get(
+                "BASIC_AUTH_PASSWORD", "bench"
+            ),
+            "DATABASE_URL": database_url,
+            "LOGGING_LEVEL": "WARNING",
+        }
+        # Initialise the schema (and stored fingerprint) once up front.
+        _time_to_ready({**base_env, "FAST_START": "false"})
+
+        modes = {"default": "false", "fast": "true"}
+        results: dict[str, list[float]] = {label: [] for label in modes}
+        # Interleave the modes so drift on the machine affects both equally.
+        for _ in range(args.runs):
+            for label, fast_start in modes.items():
+                env = {**base_env, "FAST_START": fast_start}
+                results[label].append(_time_to_ready(env) * 1000)
+
+        for label, samples in results.items():
+            print(
+                f"{label:8} import-to-ready ms: "
+                f"median={statistics.median(samples):.1f} "
+                f"min={min(samples):.1f} max={max(samples):.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Version-map storage benchmark: load the same synthetic release history
+into an "inline" and a "dedup" SQLite database and compare table size and
+history-query latency (query plus hydration into ``ReleaseOutput``).
+
+    python -m benchmarks.version_storage [--releases 5000] [--components 40]
+
+Each release changes one or two services from the previous release in
+its environment, which is the shape that deduplication targets.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, select
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from database import componentversion  # noqa: E402,F401
+from database.releasebundle import ReleaseBundle  # noqa: E402
+from database.session import create_db_engine  # noqa: E402
+from database.version_store import (  # noqa: E402
+    hydrate_releases,
+    store_versions,
+)
+from utils.bundle_id import gen_release_bundle_hash  # noqa: E402
+
+ENVIRONMENTS = ("dev", "staging", "production")
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _history(releases: int, components: int, seed: int = 7):
+    rng = random.Random(seed)
+    current = {
+        environment: {
+            f"service-{index:03d}": "1.0.0" for index in range(components)
+        }
+        for environment in ENVIRONMENTS
+    }
+    for index in range(releases):
+        environment = ENVIRONMENTS[index % len(ENVIRONMENTS)]
+        versions = dict(current[environment])
+        for service in rng.sample(sorted(versions), rng.randint(1, 2)):
+            versions[service] = f"1.{index}.{rng.randint(0, 9)}"
+        current[environment] = versions
+        yield environment, versions, BASE + timedelta(minutes=10 * index)
+
+
+def _load(db_path: Path, mode: str, releases: int, components: int):
+    engine = create_db_engine(f"sqlite:///{db_path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for environment, versions, timestamp in _history(
+            releases, components
+        ):
+            bundle = ReleaseBundle(
+                deployment_id=gen_release_bundle_hash(environment, versions),
+                environment=environment,
+                timestamp=timestamp,
+            )
+            store_versions(session, bundle, versions, mode)
+            session.add(bundle)
+        session.commit()
+    with engine.connect() as connection:
+        connection.execute(text("VACUUM"))
+    return engine
+
+
+def _history_latency_ms(engine, window_days: int, repeats: int) -> float:
+    start = BASE + timedelta(days=5)
+    end = start + timedelta(days=window_days)
+    samples = []
+    for _ in range(repeats):
+        began = time.perf_counter()
+        with Session(engine) as session:
+            bundles = session.exec(
+                select(ReleaseBundle)
+                .where(ReleaseBundle.environment == "production")
+                .where(ReleaseBundle.timestamp >= start)
+                .where(ReleaseBundle.timestamp <= end)
+                .order_by(ReleaseBundle.timestamp.desc())
+            ).all()
+            hydrate_releases(session, bundles)
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--releases", type=int, default=5000)
+    parser.add_argument("--components", type=int, default=40)
+    parser.add_argument("--window-days", type=int, default=7)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("inline", "dedup"):
+            db_path = Path(tmp) / f"{mode}.db"
+            engine = _load(db_path, mode, args.releases, args.components)
+            latency = _history_latency_ms(
+                engine, args.window_days, args.repeats
+            )
+            print(
+                f"{mode:6} size={db_path.stat().st_size / 1024:.0f} KiB "
+                f"history({args.window_days}d) median={latency:.1f} ms"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+import asyncio
+from bisect import bisect_right
+from collections import Counter as DayCounter
+from datetime import date, datetime, time, timedelta, timezone
+import gzip
+import io
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+from typing import Iterable, Iterator, Sequence
+from urllib.parse import quote
+
+from prometheus_client import Counter
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from database import session as db_session
+from database.releasebundle import ReleaseBundle
+from database.rollup import record_releases_deleted, utc_day
+from database.version_store import hydrate_releases
+from models.release_output import ReleaseOutput
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+
+# Prometheus metrics
+archive_moved_total = Counter(
+    "release_archive_moved_total",
+    "Release bundles moved from the hot table into the archive",
+    ["environment"],
+)
+
+
+def _as_utc_naive(timestamp: datetime) -> datetime:
+    """Match how the hot table stores timestamps (naive UTC)."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+class ReleaseArchive:
+    """
+    Cold storage for old release bundles: gzip-compressed NDJSON segments
+    partitioned by environment and month, plus a JSON index recording each
+    segment's row count, time bounds, per-day counts and committed length.
+    Segments are only ever appended to (as extra gzip members) and readers
+    stop at the committed length, so they never parse a member that is
+    still being written. The in-memory index is replaced, never mutated,
+    and is reloaded whenever another process rewrites ``index.json``.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        # _lock guards the index reference; _write_lock serialises appends.
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._index: dict[str, dict[str, dict]] = {}
+        self._index_stamp: tuple[int, int] | None = None
+
+    @property
+    def _index_path(self) -> Path:
+        return self.root / INDEX_FILE
+
+    def _stamp(self) -> tuple[int, int] | None:
+        try:
+            stat = self._index_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_index(self) -> dict[str, dict[str, dict]]:
+        if not self._index_path.exists():
+            return {}
+        return json.loads(self._index_path.read_text())
+
+    def _snapshot(self) -> dict[str, dict[str, dict]]:
+        """The current index, reloaded if ``index.json`` changed on disk."""
+        stamp = self._stamp()
+        with self._lock:
+            if stamp != self._index_stamp:
+                self._index = self._load_index()
+                self._index_stamp = stamp
+            return self._index
+
+    def _write_index(self, index: dict[str, dict[str, dict]]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.root / f"{INDEX_FILE}.tmp"
+        tmp_path.write_text(json.dumps(index, sort_keys=True))
+        os.replace(tmp_path, self._index_path)
+        with self._lock:
+            self._index = index
+            self._index_stamp = self._stamp()
+
+    def _segment_path(self, environment: str, month: str) -> Path:
+        return (
+            self.root / quote(environment, safe="") / f"{month}.ndjson.gz"
+        )
+
+    @staticmethod
+    def _segments(
+        index: dict[str, dict[str, dict]],
+        environment: str,
+        start: datetime,
+        end: datetime,
+    ) -> list[tuple[str, dict]]:
+        segments = index.get(environment, {})
+        return [
+            (month, meta)
+            for month, meta in sorted(segments.items())
+            if datetime.fromisoformat(meta["min"]) <= end
+            and datetime.fromisoformat(meta["max"]) >= start
+        ]
+
+    def _read_segment(
+        self, environment: str, month: str, meta: dict
+    ) -> Iterator[dict]:
+        path = self._segment_path(environment, month)
+        with open(path, "rb") as raw:
+            # Indexes written before lengths were recorded cover the file.
+            data = raw.read(meta.get("bytes", -1))
+        with gzip.GzipFile(fileobj=io.BytesIO(data)) as compressed:
+            for line in io.TextIOWrapper(compressed, encoding="utf-8"):
+                record = json.loads(line)
+                record["timestamp"] = datetime.fromisoformat(
+                    record["timestamp"]
+                )
+                yield record
+
+    def _unseen(
+        self, environment: str, month: str, meta: dict, records: list[dict]
+    ) -> list[dict]:
+        # The archive job moves rows oldest first, so rows newer than the
+        # segment's high-water mark cannot be in it yet. Older ones only
+        # turn up when a run that failed before deleting them from the hot
+        # table is retried, and only then is the segment scanned.
+        if all(record["timestamp"] > meta["max"] for record in records):
+            return records
+        seen = {
+            record["deployment_id"]
+            for record in self._read_segment(environment, month, meta)
+        }
+        return [
+            record for record in records if record["deployment_id"] not in seen
+        ]
+
+    @staticmethod
+    def _write_segment(
+        path: Path, committed: int | None, records: list[dict]
+    ) -> int:
+        """Append ``records`` as one gzip member; returns the new length."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = "".join(
+            json.dumps(record, separators=(",", ":")) + "\n"
+            for record in records
+        ).encode("utf-8")
+        with open(path, "ab") as raw:
+            if committed is not None:
+                # Drop whatever a failed run wrote after the last index
+                # update; those rows are still in the hot table.
+                raw.truncate(committed)
+            with gzip.GzipFile(fileobj=raw, mode="ab") as compressed:
+                compressed.write(payload)
+            raw.flush()
+            os.fsync(raw.fileno())
+            return os.fstat(raw.fileno()).st_size
+
+    def append(
+        self, environment: str, releases: Iterable[ReleaseOutput]
+    ) -> list[str]:
+        """Write releases to their month segments; returns ids written."""
+        by_month: dict[str, list[dict]] = {}
+        for release in releases:
+            timestamp = _as_utc_naive(release.timestamp)
+            by_month.setdefault(timestamp.strftime("%Y-%m"), []).append(
+                {
+                    "deployment_id": release.deployment_id,
+                    "environment": release.environment,
+                    "versions": release.versions,
+                    "timestamp": timestamp.isoformat(),
+                }
+            )
+
+        written: list[str] = []
+        with self._write_lock:
+            index = self._snapshot()
+            segments = dict(index.get(environment, {}))
+            for month, records in sorted(by_month.items()):
+                meta = segments.get(month)
+                if meta is not None:
+                    records = self._unseen(environment, month, meta, records)
+                if not records:
+                    continue
+
+                length = self._write_segment(
+                    self._segment_path(environment, month),
+                    # A segment the index does not know yet holds nothing
+                    # committed; anything in it is from a failed run.
+                    meta.get("bytes") if meta is not None else 0,
+                    records,
+                )
+                timestamps = [record["timestamp"] for record in records]
+                days = dict(meta["days"]) if meta is not None else {}
+                for day, count in DayCounter(
+                    timestamp[:10] for timestamp in timestamps
+                ).items():
+                    days[day] = days.get(day, 0) + count
+                segments[month] = {
+                    "count": (meta["count"] if meta else 0) + len(records),
+                    "min": min(timestamps + ([meta["min"]] if meta else [])),
+                    "max": max(timestamps + ([meta["max"]] if meta else [])),
+                    "days": days,
+                    "bytes": length,
+                }
+                written.extend(record["deployment_id"] for record in records)
+            if written:
+                self._write_index({**index, environment: segments})
+        return written
+
+    def environments(self) -> list[str]:
+        return sorted(self._snapshot())
+
+    def newest(self, environment: str) -> datetime | None:
+        """Timestamp of the newest archived record for ``environment``."""
+        segments = self._snapshot().get(environment)
+        if not segments:
+            return None
+        return datetime.fromisoformat(
+            max(meta["max"] for meta in segments.values())
+        )
+
+    def history(
+        self, environment: str, start: datetime, end: datetime
+    ) -> list[dict]:
+        """Archived records in ``[start, end]``, newest first."""
+        start = _as_utc_naive(start)
+        end = _as_utc_naive(end)
+        index = self._snapshot()
+        records = [
+            record
+            for month, meta in self._segments(index, environment, start, end)
+            for record in self._read_segment(environment, month, meta)
+            if start <= record["timestamp"] <= end
+        ]
+        records.sort(key=lambda record: record["timestamp"], reverse=True)
+        return records
+
+    def latest_at(
+        self,
+        environment: str,
+        points: Sequence[tuple[datetime, datetime | None]],
+    ) -> list[dict | None]:
+        """
+        For each ``(ts, newer_than)`` point, the latest archived record at or
+        before ``ts`` and after ``newer_than`` (when given), or ``None``.
+        Segments are searched newest first and read at most once per call.
+        """
+        segments = sorted(
+            self._snapshot().get(environment, {}).items(), reverse=True
+        )
+        loaded: dict[str, tuple[list[datetime], list[dict]]] = {}
+        results: list[dict | None] = []
+        for ts, newer_than in points:
+            ts = _as_utc_naive(ts)
+            if newer_than is not None:
+                newer_than = _as_utc_naive(newer_than)
+            found = None
+            for month, meta in segments:
+                if (
+                    newer_than is not None
+                    and datetime.fromisoformat(meta["max"]) <= newer_than
+                ):
+                    break
+                if datetime.fromisoformat(meta["min"]) > ts:
+                    continue
+                if month not in loaded:
+                    records = sorted(
+                        self._read_segment(environment, month, meta),
+                        key=lambda record: record["timestamp"],
+                    )
+                    loaded[month] = (
+                        [record["timestamp"] for record in records],
+                        records,
+                    )
+                timestamps, records = loaded[month]
+                position = bisect_right(timestamps, ts)
+                if position:
+                    candidate = records[position - 1]
+                    if (
+                        newer_than is None
+                        or candidate["timestamp"] > newer_than
+                    ):
+                        found = candidate
+                    break
+            results.append(found)
+        return results
+
+    def count(self, environment: str, start: datetime, end: datetime) -> int:
+        """
+        Count archived records in ``[start, end]``. Days wholly inside the
+        window come from the index; only segments holding a partial edge day
+        are decompressed.
+        """
+        start = _as_utc_naive(start)
+        end = _as_utc_naive(end)
+        index = self._snapshot()
+        total = 0
+        for month, meta in self._segments(index, environment, start, end):
+            partial_days: set[str] = set()
+            for day, count in meta["days"].items():
+                day_start = datetime.combine(date.fromisoformat(day), time.min)
+                day_end = day_start + timedelta(days=1)
+                if day_end <= start or day_start > end:
+                    continue
+                if start <= day_start and day_end <= end:
+                    total += count
+                else:
+                    partial_days.add(day)
+            if partial_days:
+                total += sum(
+                    1
+                    for record in self._read_segment(environment, month, meta)
+                    if record["timestamp"].date().isoformat() in partial_days
+                    and start <= record["timestamp"] <= end
+                )
+        return total
+
+
+def count_hot_duplicates(
+    session: Session,
+    archive: ReleaseArchive,
+    environment: str,
+    start: datetime,
+    end: datetime,
+) -> int:
+    """
+    Releases in ``[start, end]`` that are in both the hot table and the
+    archive, as a run that failed before deleting its chunk leaves them.
+    Hot rows newer than everything archived cannot be duplicates, so the
+    archive is only read when older hot rows fall inside the window.
+    """
+    newest = archive.newest(environment)
+    start = _as_utc_naive(start)
+    if newest is None or newest < start:
+        return 0
+    end = min(_as_utc_naive(end), newest)
+    hot_ids = session.exec(
+        select(ReleaseBundle.deployment_id)
+        .where(ReleaseBundle.environment == environment)
+        .where(ReleaseBundle.timestamp >= start)
+        .where(ReleaseBundle.timestamp <= end)
+    ).all()
+    if not hot_ids:
+        return 0
+    archived = {
+        record["deployment_id"]
+        for record in archive.history(environment, start, end)
+    }
+    return len(archived.intersection(hot_ids))
+
+
+def archive_old_releases(
+    session: Session,
+    archive: ReleaseArchive,
+    cutoff: datetime,
+    chunk_size: int = 1000,
+) -> dict[str, int]:
+    """
+    Move bundles older than ``cutoff`` from the hot table into ``archive``,
+    one chunk per transaction. Rows are written to the archive before they
+    are deleted, so a failure part-way leaves them in both places rather
+    than in neither; ``ReleaseArchive.append`` skips them on the next run.
+    """
+    environments = session.exec(
+        select(ReleaseBundle.environment)
+        .where(ReleaseBundle.timestamp < cutoff)
+        .distinct()
+    ).all()
+
+    moved: dict[str, int] = {}
+    for environment in environments:
+        while True:
+            bundles = session.exec(
+                select(ReleaseBundle)
+                .where(ReleaseBundle.environment == environment)
+                .where(ReleaseBundle.timestamp < cutoff)
+                .order_by(ReleaseBundle.timestamp)
+                .limit(chunk_size)
+            ).all()
+            if not bundles:
+                break
+
+            archive.append(environment, hydrate_releases(session, bundles))
+            session.exec(
+                delete(ReleaseBundle).where(
+                    ReleaseBundle.deployment_id.in_(
+                        [bundle.deployment_id for bundle in bundles]
+                    )
+                )
+            )
+            record_releases_deleted(
+                session,
+                environment,
+                DayCounter(utc_day(bundle.timestamp) for bundle in bundles),
+            )
+            session.commit()
+            session.expunge_all()
+            moved[environment] = moved.get(environment, 0) + len(bundles)
+            archive_moved_total.labels(environment=environment).inc(
+                len(bundles)
+            )
+    logger.info(
+        "archived old releases",
+        extra={"moved": moved, "count": sum(moved.values())},
+    )
+    return moved
+
+
+def _run_archive_once(
+    archive: ReleaseArchive, after_days: int, chunk_size: int
+) -> None:
+    if db_session.engine is None:
+        raise RuntimeError("Database engine is not initialized")
+    cutoff = datetime.now(timezone.utc) - timedelta(days=after_days)
+    with Session(db_session.engine) as session:
+        archive_old_releases(session, archive, cutoff, chunk_size=chunk_size)
+
+
+async def run_archive_loop(
+    archive: ReleaseArchive,
+    after_days: int,
+    interval_seconds: float,
+    chunk_size: int,
+) -> None:
+    """Archive releases older than ``after_days``; runs until cancelled."""
+    while True:
+        try:
+            await asyncio.to_thread(
+                _run_archive_once, archive, after_days, chunk_size
+            )
+        except Exception:
+            logger.exception("archive run failed")
+        await asyncio.sleep(interval_seconds)
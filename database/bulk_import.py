@@ -0,0 +1,317 @@
+import argparse
+from collections import Counter as DayCounter
+import csv
+from datetime import datetime, timezone
+import io
+from itertools import islice
+import json
+import logging
+from pathlib import Path
+import time
+from typing import Callable, Iterable, Iterator
+
+from sqlalchemy import Connection, Engine, Row, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, SQLModel
+
+from database.releasebundle import ReleaseBundle
+from database.rollup import record_releases_created, utc_day
+from database.snapshot_generation import bump_history_generation
+from database.version_store import STORAGE_DEDUP, intern_pairs
+from utils.bundle_id import gen_release_bundle_hash
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    "deployment_id",
+    "environment",
+    "versions",
+    "component_ids",
+    "timestamp",
+)
+STAGING_TABLE = "release_import_staging"
+
+
+def read_records(path: Path, fmt: str) -> Iterator[dict | str]:
+    """
+    Yield raw records from an NDJSON (one JSON line each) or CSV dump, in
+    file order. Parsing is left to ``prepare_record`` so one malformed
+    record is rejected on its own instead of aborting the import.
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            yield from csv.DictReader(handle)
+            return
+        for line in handle:
+            if line.strip():
+                yield line
+
+
+def prepare_record(raw: dict | str) -> dict:
+    """
+    Validate a raw record and return a row ready to insert. A supplied
+    ``deployment_id`` must match ``gen_release_bundle_hash``; a missing
+    one is computed. Timestamps are stored as naive UTC, like the API.
+    """
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    environment = raw["environment"]
+    versions = raw["versions"]
+    if isinstance(versions, str):
+        versions = json.loads(versions)
+    if not isinstance(environment, str) or not isinstance(versions, dict):
+        raise ValueError("environment must be a string, versions a mapping")
+    if not all(
+        isinstance(key, str) and isinstance(value, str)
+        for key, value in versions.items()
+    ):
+        raise ValueError("versions must map strings to strings")
+
+    deployment_id = gen_release_bundle_hash(environment, versions)
+    supplied = raw.get("deployment_id")
+    if supplied and supplied != deployment_id:
+        raise ValueError(f"deployment_id mismatch for {supplied}")
+
+    timestamp = raw.get("timestamp")
+    if timestamp:
+        timestamp = datetime.fromisoformat(timestamp)
+    else:
+        timestamp = datetime.now(timezone.utc)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return {
+        "deployment_id": deployment_id,
+        "environment": environment,
+        "versions": versions,
+        "component_ids": None,
+        "timestamp": timestamp,
+    }
+
+
+def _dedup_rows(connection: Connection, rows: list[dict]) -> None:
+    with Session(bind=connection) as session:
+        ids = intern_pairs(
+            session,
+            (pair for row in rows for pair in row["versions"].items()),
+        )
+        session.flush()
+    for row in rows:
+        row["component_ids"] = [
+            ids[pair] for pair in sorted(row["versions"].items())
+        ]
+        row["versions"] = None
+
+
+def _json_or_null(value) -> str:
+    # An unquoted empty field is NULL in COPY's CSV format.
+    return "" if value is None else json.dumps(value, separators=(",", ":"))
+
+
+def _load_sqlite(connection: Connection, rows: list[dict]) -> list[Row]:
+    table = ReleaseBundle.__table__
+    statement = (
+        sqlite_insert(table)
+        .on_conflict_do_nothing(index_elements=["deployment_id"])
+        .returning(table.c.environment, table.c.timestamp)
+    )
+    return connection.execute(statement, rows).all()
+
+
+def _load_postgres(connection: Connection, rows: list[dict]) -> list[Row]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            (
+                row["deployment_id"],
+                row["environment"],
+                _json_or_null(row["versions"]),
+                _json_or_null(row["component_ids"]),
+                row["timestamp"].isoformat(),
+            )
+        )
+    buffer.seek(0)
+
+    connection.execute(
+        text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+            f"(LIKE {ReleaseBundle.__tablename__}) ON COMMIT DELETE ROWS"
+        )
+    )
+    columns = ", ".join(COLUMNS)
+    dbapi_connection = connection.connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    result = connection.execute(
+        text(
+            f"INSERT INTO {ReleaseBundle.__tablename__} ({columns}) "
+            f"SELECT {columns} FROM {STAGING_TABLE} "
+            "ON CONFLICT (deployment_id) DO NOTHING "
+            "RETURNING environment, timestamp"
+        ).columns(
+            ReleaseBundle.__table__.c.environment,
+            ReleaseBundle.__table__.c.timestamp,
+        )
+    )
+    return result.all()
+
+
+_LOADERS = {
+    "postgresql": _load_postgres,
+    "sqlite": _load_sqlite,
+}
+
+
+def _chunks(records: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _import_chunk(
+    connection: Connection,
+    loader: Callable[[Connection, list[dict]], list[Row]],
+    chunk: list,
+    stats: dict[str, int],
+    versions_storage: str,
+) -> None:
+    rows = []
+    for position, raw in enumerate(chunk, start=stats["read"] + 1):
+        try:
+            rows.append(prepare_record(raw))
+        except (KeyError, TypeError, ValueError) as exc:
+            stats["rejected"] += 1
+            logger.warning(
+                "rejected release record",
+                extra={"record": position, "error": str(exc)},
+            )
+    inserted = []
+    with connection.begin():
+        if rows and versions_storage == STORAGE_DEDUP:
+            _dedup_rows(connection, rows)
+        if rows:
+            inserted = loader(connection, rows)
+        # Only rows actually inserted are counted, in the chunk's own
+        # transaction, like the API keeps the rollup in step.
+        with Session(bind=connection) as session:
+            record_releases_created(
+                session,
+                DayCounter(
+                    (environment, utc_day(timestamp))
+                    for environment, timestamp in inserted
+                ),
+            )
+            # Imported rows may land in windows other replicas have
+            # already served as history snapshots.
+            for environment in sorted({row[0] for row in inserted}):
+                bump_history_generation(session, environment)
+            session.flush()
+    stats["read"] += len(chunk)
+    stats["inserted"] += len(inserted)
+    stats["skipped"] += len(rows) - len(inserted)
+
+
+def _state_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.import-state")
+
+
+def import_releases(
+    engine: Engine,
+    path: str | Path,
+    fmt: str | None = None,
+    chunk_size: int = 10000,
+    resume: bool = False,
+    versions_storage: str = "inline",
+) -> dict[str, int]:
+    """
+    Load a release dump straight into ``ReleaseBundle``, bypassing the API.
+    Postgres loads each chunk with ``COPY`` into a temp table followed by an
+    ``INSERT ... ON CONFLICT DO NOTHING``; SQLite uses one ``executemany``
+    ``INSERT OR IGNORE`` per chunk. Each chunk is its own transaction and
+    the number of records consumed is checkpointed next to the dump, so an
+    interrupted import continues where it stopped with ``resume=True``.
+    Existing and repeated deployment ids are skipped. With
+    ``versions_storage="dedup"`` version maps are interned in the same
+    transaction as their chunk.
+    """
+    path = Path(path)
+    fmt = fmt or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+    loader = _LOADERS.get(engine.dialect.name)
+    if loader is None:
+        raise ValueError(f"Unsupported database dialect {engine.dialect.name}")
+
+    state_path = _state_path(path)
+    offset = 0
+    if resume and state_path.exists():
+        offset = json.loads(state_path.read_text())["records"]
+        logger.info("resuming release import", extra={"records": offset})
+
+    SQLModel.metadata.create_all(engine)
+
+    stats = {"read": offset, "inserted": 0, "skipped": 0, "rejected": 0}
+    started = time.perf_counter()
+    records = islice(read_records(path, fmt), offset, None)
+    # One INFO line per hashed bundle would dominate a bulk import.
+    bundle_logger = logging.getLogger("utils.bundle_id")
+    previous_level = bundle_logger.level
+    bundle_logger.setLevel(logging.WARNING)
+    try:
+        with engine.connect() as connection:
+            for chunk in _chunks(records, chunk_size):
+                _import_chunk(
+                    connection, loader, chunk, stats, versions_storage
+                )
+                state_path.write_text(json.dumps({"records": stats["read"]}))
+
+                elapsed = time.perf_counter() - started
+                rate = (stats["read"] - offset) / elapsed if elapsed else 0
+                logger.info(
+                    "imported release chunk",
+                    extra={**stats, "rows_per_second": round(rate)},
+                )
+    finally:
+        bundle_logger.setLevel(previous_level)
+
+    state_path.unlink(missing_ok=True)
+    logger.info("finished release import", extra=stats)
+    return stats
+
+
+def main(argv: list[str] | None = None) -> None:
+    from database.session import create_db_engine
+    from utils.config import get_settings
+    from utils.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(
+        prog="python -m main import",
+        description="Bulk load an NDJSON or CSV release dump.",
+    )
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=("ndjson", "csv"))
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue from the last checkpoint of an interrupted import",
+    )
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    configure_logging(level=settings.logging_level)
+    engine = create_db_engine(settings.database_url, echo=settings.sql_echo)
+    import_releases(
+        engine,
+        args.path,
+        fmt=args.format,
+        chunk_size=args.chunk_size,
+        resume=args.resume,
+        versions_storage=settings.versions_storage,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+from sqlalchemy import UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+
+class ComponentVersion(SQLModel, table=True):
+    __tablename__ = "component_version"
+    __table_args__ = (UniqueConstraint("service", "version"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    service: str
+    version: str
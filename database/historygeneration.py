@@ -0,0 +1,8 @@
+from sqlmodel import Field, SQLModel
+
+
+class HistoryGeneration(SQLModel, table=True):
+    __tablename__ = "history_generation"
+
+    environment: str = Field(primary_key=True)
+    generation: int = Field(default=0)
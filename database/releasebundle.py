@@ -1,12 +1,27 @@
 from datetime import datetime, timezone
 from sqlmodel import Field, SQLModel
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Index, JSON
 
 
 class ReleaseBundle(SQLModel, table=True):
+    __table_args__ = (
+        Index(
+            "ix_releasebundle_environment_timestamp",
+            "environment",
+            "timestamp",
+        ),
+    )
+
     deployment_id: str = Field(default=None, primary_key=True)
     environment: str = Field(index=True)
-    versions: dict[str, str] = Field(sa_column=Column(JSON))
+    versions: dict[str, str] | None = Field(
+        default=None, sa_column=Column(JSON(none_as_null=True))
+    )
+    # Set instead of ``versions`` in "dedup" storage mode: ids of
+    # ``ComponentVersion`` rows, one per (service, version) pair.
+    component_ids: list[int] | None = Field(
+        default=None, sa_column=Column(JSON(none_as_null=True))
+    )
     timestamp: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc)
     )
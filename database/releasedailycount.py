@@ -0,0 +1,11 @@
+from datetime import date
+
+from sqlmodel import Field, SQLModel
+
+
+class ReleaseDailyCount(SQLModel, table=True):
+    __tablename__ = "release_daily_count"
+
+    environment: str = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    count: int = Field(default=0)
@@ -0,0 +1,154 @@
+import asyncio
+from collections import Counter as DayCounter
+from datetime import datetime, timedelta, timezone
+from fnmatch import fnmatchcase
+import logging
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from database import session as db_session
+from database.releasebundle import ReleaseBundle
+from database.rollup import record_releases_deleted, utc_day
+from database.snapshot_generation import bump_history_generation
+from utils.history_snapshots import HistorySnapshots
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+retention_deleted_total = Counter(
+    "release_retention_deleted_total",
+    "Release bundles removed by the retention policy",
+    ["environment"],
+)
+retention_last_run = Gauge(
+    "release_retention_last_run_timestamp_seconds",
+    "Unix time the retention policy last completed",
+)
+
+
+def delete_releases_in_range(
+    session: Session,
+    environment: str,
+    start: datetime | None,
+    end: datetime,
+    chunk_size: int = 1000,
+) -> int:
+    """
+    Delete an environment's bundles in ``[start, end]`` in chunks of
+    ``chunk_size`` rows, committing after each chunk so locks stay short.
+    ``start=None`` deletes everything up to ``end``. Returns rows deleted.
+    """
+    total = 0
+    while True:
+        statement = (
+            select(ReleaseBundle.deployment_id, ReleaseBundle.timestamp)
+            .where(ReleaseBundle.environment == environment)
+            .where(ReleaseBundle.timestamp <= end)
+            .order_by(ReleaseBundle.timestamp)
+            .limit(chunk_size)
+        )
+        if start is not None:
+            statement = statement.where(ReleaseBundle.timestamp >= start)
+        rows = session.exec(statement).all()
+        if not rows:
+            return total
+
+        session.exec(
+            delete(ReleaseBundle).where(
+                ReleaseBundle.deployment_id.in_(
+                    [deployment_id for deployment_id, _ in rows]
+                )
+            )
+        )
+        record_releases_deleted(
+            session,
+            environment,
+            DayCounter(utc_day(timestamp) for _, timestamp in rows),
+        )
+        bump_history_generation(session, environment)
+        session.commit()
+        total += len(rows)
+        logger.info(
+            "deleted release chunk",
+            extra={"environment": environment, "count": len(rows)},
+        )
+
+
+def _retention_for(environment: str, policy: dict[str, int]) -> int | None:
+    if environment in policy:
+        return policy[environment]
+    matches = [
+        days
+        for pattern, days in policy.items()
+        if fnmatchcase(environment, pattern)
+    ]
+    return min(matches) if matches else None
+
+
+def apply_retention_policy(
+    session: Session,
+    policy: dict[str, int],
+    chunk_size: int = 1000,
+    now: datetime | None = None,
+) -> dict[str, int]:
+    """
+    Prune bundles older than the configured number of days. ``policy`` maps
+    an environment name or glob pattern (``preview-*``) to a day count.
+    Returns the number of rows removed per environment.
+    """
+    now = now or datetime.now(timezone.utc)
+    environments = session.exec(
+        select(ReleaseBundle.environment).distinct()
+    ).all()
+
+    removed: dict[str, int] = {}
+    for environment in environments:
+        days = _retention_for(environment, policy)
+        if days is None:
+            continue
+        cutoff = now - timedelta(days=days)
+        deleted = delete_releases_in_range(
+            session, environment, None, cutoff, chunk_size=chunk_size
+        )
+        if deleted:
+            removed[environment] = deleted
+            retention_deleted_total.labels(environment=environment).inc(
+                deleted
+            )
+    retention_last_run.set_to_current_time()
+    logger.info(
+        "applied retention policy",
+        extra={"removed": removed, "count": sum(removed.values())},
+    )
+    return removed
+
+
+def _run_retention_once(
+    policy: dict[str, int], chunk_size: int
+) -> dict[str, int]:
+    if db_session.engine is None:
+        raise RuntimeError("Database engine is not initialized")
+    with Session(db_session.engine) as session:
+        return apply_retention_policy(session, policy, chunk_size=chunk_size)
+
+
+async def run_retention_loop(
+    policy: dict[str, int],
+    interval_seconds: float,
+    chunk_size: int,
+    snapshots: HistorySnapshots | None = None,
+) -> None:
+    """Apply the retention policy every ``interval_seconds``; runs forever."""
+    while True:
+        try:
+            removed = await asyncio.to_thread(
+                _run_retention_once, policy, chunk_size
+            )
+            if snapshots is not None:
+                for environment in removed:
+                    snapshots.invalidate(environment)
+        except Exception:
+            logger.exception("retention policy run failed")
+        await asyncio.sleep(interval_seconds)
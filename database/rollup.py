@@ -0,0 +1,212 @@
+from datetime import date, datetime, time, timedelta, timezone
+import logging
+
+from sqlalchemy import Date, delete, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from database.releasebundle import ReleaseBundle
+from database.releasedailycount import ReleaseDailyCount
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+
+def utc_day(timestamp: datetime) -> date:
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date()
+
+
+def utc_naive(timestamp: datetime) -> datetime:
+    """Convert to naive UTC, the form ``ReleaseBundle.timestamp`` holds."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def _midnight(day: date, tzinfo) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=tzinfo)
+
+
+def _increment(
+    session: Session, environment: str, day: date, amount: int = 1
+) -> None:
+    dialect = session.get_bind().dialect.name
+    insert = _UPSERT_INSERTS.get(dialect)
+    if insert is not None:
+        table = ReleaseDailyCount.__table__
+        statement = insert(table).values(
+            environment=environment, day=day, count=amount
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.environment, table.c.day],
+            set_={"count": table.c.count + amount},
+        )
+        session.exec(statement)
+        return
+
+    result = session.exec(
+        update(ReleaseDailyCount)
+        .where(ReleaseDailyCount.environment == environment)
+        .where(ReleaseDailyCount.day == day)
+        .values(count=ReleaseDailyCount.count + amount)
+    )
+    if result.rowcount == 0:
+        session.add(
+            ReleaseDailyCount(environment=environment, day=day, count=amount)
+        )
+
+
+def record_release_created(session: Session, bundle: ReleaseBundle) -> None:
+    """Count a new bundle in the rollup; the caller commits."""
+    _increment(session, bundle.environment, utc_day(bundle.timestamp))
+
+
+def record_releases_created(
+    session: Session, day_counts: dict[tuple[str, date], int]
+) -> None:
+    """Add per-(environment, day) insertions to the rollup; caller commits."""
+    for (environment, day), amount in sorted(day_counts.items()):
+        _increment(session, environment, day, amount)
+
+
+def record_release_deleted(session: Session, bundle: ReleaseBundle) -> None:
+    """Remove a deleted bundle from the rollup; the caller commits."""
+    record_releases_deleted(
+        session, bundle.environment, {utc_day(bundle.timestamp): 1}
+    )
+
+
+def record_releases_deleted(
+    session: Session, environment: str, day_counts: dict[date, int]
+) -> None:
+    """Subtract per-day deletions from the rollup; the caller commits."""
+    for day, amount in day_counts.items():
+        session.exec(
+            update(ReleaseDailyCount)
+            .where(ReleaseDailyCount.environment == environment)
+            .where(ReleaseDailyCount.day == day)
+            .values(count=ReleaseDailyCount.count - amount)
+        )
+    if day_counts:
+        session.exec(
+            delete(ReleaseDailyCount)
+            .where(ReleaseDailyCount.environment == environment)
+            .where(ReleaseDailyCount.day.in_(list(day_counts)))
+            .where(ReleaseDailyCount.count <= 0)
+        )
+
+
+def _count_raw(
+    session: Session, environment: str, start: datetime, end: datetime,
+    include_end: bool = True,
+) -> int:
+    statement = (
+        select(func.count())
+        .select_from(ReleaseBundle)
+        .where(ReleaseBundle.environment == environment)
+        .where(ReleaseBundle.timestamp >= start)
+    )
+    if include_end:
+        statement = statement.where(ReleaseBundle.timestamp <= end)
+    else:
+        statement = statement.where(ReleaseBundle.timestamp < end)
+    return session.exec(statement).one()
+
+
+def count_releases(
+    session: Session, environment: str, start: datetime, end: datetime
+) -> int:
+    """
+    Count releases in ``[start, end]``. Whole UTC days inside the window are
+    summed from the rollup; only the partial days at either edge are counted
+    from the raw table.
+    """
+    tzinfo = None
+    if start.tzinfo is not None:
+        tzinfo = timezone.utc
+        start = start.astimezone(timezone.utc)
+        end = end.astimezone(timezone.utc)
+
+    first_full = start.date()
+    if start != _midnight(first_full, tzinfo):
+        first_full += timedelta(days=1)
+    last_full = end.date() - timedelta(days=1)
+
+    if first_full > last_full:
+        return _count_raw(session, environment, start, end)
+
+    rollup_total = session.exec(
+        select(func.coalesce(func.sum(ReleaseDailyCount.count), 0))
+        .where(ReleaseDailyCount.environment == environment)
+        .where(ReleaseDailyCount.day >= first_full)
+        .where(ReleaseDailyCount.day <= last_full)
+    ).one()
+    head = _count_raw(
+        session,
+        environment,
+        start,
+        _midnight(first_full, tzinfo),
+        include_end=False,
+    )
+    tail = _count_raw(
+        session, environment, _midnight(end.date(), tzinfo), end
+    )
+    return int(rollup_total) + head + tail
+
+
+def rebuild_daily_counts(session: Session) -> int:
+    """Recompute the whole rollup from ``ReleaseBundle``; returns row count."""
+    day = func.date(ReleaseBundle.timestamp, type_=Date)
+    rows = session.exec(
+        select(ReleaseBundle.environment, day, func.count())
+        .group_by(ReleaseBundle.environment, day)
+    ).all()
+    session.exec(delete(ReleaseDailyCount))
+    session.add_all(
+        ReleaseDailyCount(environment=environment, day=bucket, count=count)
+        for environment, bucket, count in rows
+    )
+    session.commit()
+    logger.info("rebuilt daily release counts", extra={"rows": len(rows)})
+    return len(rows)
+
+
+def ensure_daily_counts(session: Session) -> None:
+    """
+    Rebuild the rollup when it is empty but releases exist, as on a
+    database created before the rollup table was added.
+    """
+    has_counts = session.exec(select(ReleaseDailyCount.day).limit(1)).first()
+    if has_counts is not None:
+        return
+    has_releases = session.exec(
+        select(ReleaseBundle.deployment_id).limit(1)
+    ).first()
+    if has_releases is not None:
+        rebuild_daily_counts(session)
+
+
+def main() -> None:
+    from sqlmodel import SQLModel
+
+    from database.session import create_db_engine
+    from utils.config import get_settings
+    from utils.logging_config import configure_logging
+
+    settings = get_settings()
+    configure_logging(level=settings.logging_level)
+    engine = create_db_engine(settings.database_url, echo=settings.sql_echo)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        rebuild_daily_counts(session)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
+import asyncio
+import hashlib
+import logging
 from typing import Generator
 
 from prometheus_client import Counter, Gauge
 from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel import SQLModel, Session, create_engine
 
 engine = None
 
+logger = logging.getLogger(__name__)
+
 # Prometheus metrics
 db_pool_checked_out = Gauge(
     "db_pool_checked_out",
@@ -59,18 +65,87 @@ def create_db_engine(db_url: str, echo: bool = False):
     return sql_engine
 
 
-def init_db(db_url: str, echo: bool = False) -> None:
-    """Initialize engine, create tables, and seed health status row."""
+def schema_fingerprint() -> str:
+    """Hash of every table, column and index the models declare."""
+    parts = []
+    for table in sorted(SQLModel.metadata.sorted_tables, key=str):
+        parts.append(table.name)
+        parts.extend(
+            f"{column.name}:{column.type}:{column.primary_key}"
+            for column in table.columns
+        )
+        parts.extend(sorted(index.name for index in table.indexes))
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def _schema_is_current(sql_engine, fingerprint: str) -> bool:
+    from database.schemaversion import SchemaVersion
+
+    try:
+        with Session(sql_engine) as session:
+            stored = session.get(SchemaVersion, 1)
+    except SQLAlchemyError:
+        return False
+    return stored is not None and stored.fingerprint == fingerprint
+
+
+def init_db(db_url: str, echo: bool = False, fast_start: bool = False) -> None:
+    """
+    Initialize engine, create tables, and seed health status row. With
+    ``fast_start`` the DDL and seeding are skipped when the stored schema
+    fingerprint matches the models.
+    """
     global engine
     engine = create_db_engine(db_url, echo=echo)
-    SQLModel.metadata.create_all(engine)
 
+    from database import componentversion, healthcheck  # noqa: F401
+    from database import historygeneration  # noqa: F401
+    from database import releasebundle, releasedailycount  # noqa: F401
+    from database import schemaversion  # noqa: F401
     from database.healthcheck import HealthStatus
+    from database.schemaversion import SchemaVersion
+
+    fingerprint = schema_fingerprint()
+    if fast_start and _schema_is_current(engine, fingerprint):
+        logger.info("schema is current; skipping create_all")
+        return
+
+    SQLModel.metadata.create_all(engine)
+    from database.version_store import ensure_component_ids_column
+
+    ensure_component_ids_column(engine)
+
+    from database.rollup import ensure_daily_counts
 
     with Session(engine) as session:
+        ensure_daily_counts(session)
         if not session.get(HealthStatus, 1):
             session.add(HealthStatus(id=1, ok=True))
-            session.commit()
+        session.merge(SchemaVersion(id=1, fingerprint=fingerprint))
+        session.commit()
+
+
+def prewarm_pool(connections: int | None = None) -> None:
+    """Open pooled connections ahead of the first requests."""
+    if engine is None:
+        raise RuntimeError("Database engine is not initialized")
+    if connections is None:
+        connections = getattr(engine.pool, "size", lambda: 1)()
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+
+
+async def run_prewarm_pool() -> None:
+    """Pre-warm the pool off the event loop; a failure is only logged."""
+    try:
+        await asyncio.to_thread(prewarm_pool)
+    except Exception:
+        logger.exception("connection pool prewarm failed")
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -0,0 +1,49 @@
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from database.historygeneration import HistoryGeneration
+
+_UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+
+def history_generation(session: Session, environment: str) -> int:
+    """
+    Current invalidation counter for ``environment``. Read it before
+    querying history and keep it with any snapshot built from the result.
+    """
+    generation = session.exec(
+        select(HistoryGeneration.generation).where(
+            HistoryGeneration.environment == environment
+        )
+    ).first()
+    return generation or 0
+
+
+def bump_history_generation(session: Session, environment: str) -> None:
+    """
+    Invalidate every replica's history snapshots for ``environment``; call
+    it in the transaction that changes past releases. The caller commits.
+    """
+    insert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if insert is not None:
+        table = HistoryGeneration.__table__
+        statement = insert(table).values(environment=environment, generation=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.environment],
+            set_={"generation": table.c.generation + 1},
+        )
+        session.exec(statement)
+        return
+
+    result = session.exec(
+        update(HistoryGeneration)
+        .where(HistoryGeneration.environment == environment)
+        .values(generation=HistoryGeneration.generation + 1)
+    )
+    if result.rowcount == 0:
+        session.add(HistoryGeneration(environment=environment, generation=1))
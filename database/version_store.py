@@ -0,0 +1,309 @@
+import argparse
+from collections import OrderedDict
+import logging
+import threading
+from typing import Iterable, Mapping, Sequence
+
+from sqlalchemy import Engine, inspect, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from database.componentversion import ComponentVersion
+from database.releasebundle import ReleaseBundle
+from models.release_output import ReleaseOutput
+
+logger = logging.getLogger(__name__)
+
+STORAGE_INLINE = "inline"
+STORAGE_DEDUP = "dedup"
+
+# Keeps IN (...) lists well under SQLite's bound-parameter limit.
+_LOOKUP_BATCH = 500
+_CACHE_SIZE = 100_000
+
+_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+Pair = tuple[str, str]
+
+
+class _ComponentCache:
+    """
+    LRU of component id <-> (service, version); rows never change. Shared
+    by every request thread, so all access goes through the lock.
+    """
+
+    def __init__(self, max_entries: int = _CACHE_SIZE):
+        self.max_entries = max_entries
+        self._by_id: OrderedDict[int, Pair] = OrderedDict()
+        self._by_pair: dict[Pair, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, component_id: int, pair: Pair) -> None:
+        with self._lock:
+            self._by_id[component_id] = pair
+            self._by_id.move_to_end(component_id)
+            self._by_pair[pair] = component_id
+            while len(self._by_id) > self.max_entries:
+                _, evicted = self._by_id.popitem(last=False)
+                self._by_pair.pop(evicted, None)
+
+    def get(self, component_id: int) -> Pair | None:
+        with self._lock:
+            pair = self._by_id.get(component_id)
+            if pair is not None:
+                self._by_id.move_to_end(component_id)
+            return pair
+
+    def id_for(self, pair: Pair) -> int | None:
+        with self._lock:
+            return self._by_pair.get(pair)
+
+
+# Component ids are only meaningful within one database.
+_caches: dict[str, _ComponentCache] = {}
+
+
+def _cache_for(session: Session) -> _ComponentCache:
+    key = str(session.get_bind().engine.url)
+    return _caches.setdefault(key, _ComponentCache())
+
+
+def _batches(items: Sequence, size: int = _LOOKUP_BATCH):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def intern_pairs(session: Session, pairs: Iterable[Pair]) -> dict[Pair, int]:
+    """Return component ids for ``pairs``, inserting any that are new."""
+    cache = _cache_for(session)
+    wanted = set(pairs)
+    ids = {}
+    for pair in wanted:
+        component_id = cache.id_for(pair)
+        if component_id is not None:
+            ids[pair] = component_id
+    missing = sorted(wanted - ids.keys())
+    if not missing:
+        return ids
+
+    table = ComponentVersion.__table__
+    insert = _INSERTS.get(session.get_bind().engine.dialect.name)
+    for batch in _batches(missing):
+        columns = tuple_(ComponentVersion.service, ComponentVersion.version)
+        found = {
+            (service, version): component_id
+            for component_id, service, version in session.exec(
+                select(
+                    ComponentVersion.id,
+                    ComponentVersion.service,
+                    ComponentVersion.version,
+                ).where(columns.in_(batch))
+            ).all()
+        }
+        # Only committed rows are cached: ids inserted below could still
+        # be rolled back with the caller's transaction.
+        for pair, component_id in found.items():
+            cache.add(component_id, pair)
+        new = [pair for pair in batch if pair not in found]
+        if new:
+            values = [
+                {"service": service, "version": version}
+                for service, version in new
+            ]
+            if insert is not None:
+                session.exec(
+                    insert(table).values(values).on_conflict_do_nothing()
+                )
+            else:
+                session.exec(table.insert().values(values))
+            found.update(
+                ((service, version), component_id)
+                for component_id, service, version in session.exec(
+                    select(
+                        ComponentVersion.id,
+                        ComponentVersion.service,
+                        ComponentVersion.version,
+                    ).where(columns.in_(new))
+                ).all()
+            )
+        ids.update(found)
+    return ids
+
+
+def intern_versions(
+    session: Session, versions: Mapping[str, str]
+) -> list[int]:
+    """Component ids for a version map, ordered by service name."""
+    pairs = sorted(versions.items())
+    ids = intern_pairs(session, pairs)
+    return [ids[pair] for pair in pairs]
+
+
+def store_versions(
+    session: Session,
+    bundle: ReleaseBundle,
+    versions: Mapping[str, str],
+    mode: str,
+) -> None:
+    """Fill ``bundle`` with ``versions`` in the configured storage mode."""
+    if mode == STORAGE_DEDUP:
+        bundle.versions = None
+        bundle.component_ids = intern_versions(session, versions)
+    else:
+        bundle.versions = dict(versions)
+        bundle.component_ids = None
+
+
+def _resolve(session: Session, component_ids: Iterable[int]) -> dict:
+    cache = _cache_for(session)
+    resolved: dict[int, Pair] = {}
+    missing = []
+    for component_id in set(component_ids):
+        pair = cache.get(component_id)
+        if pair is None:
+            missing.append(component_id)
+        else:
+            resolved[component_id] = pair
+    for batch in _batches(sorted(missing)):
+        for component_id, service, version in session.exec(
+            select(
+                ComponentVersion.id,
+                ComponentVersion.service,
+                ComponentVersion.version,
+            ).where(ComponentVersion.id.in_(batch))
+        ).all():
+            cache.add(component_id, (service, version))
+            resolved[component_id] = (service, version)
+    return resolved
+
+
+def hydrate_releases(
+    session: Session, bundles: Sequence[ReleaseBundle]
+) -> list[ReleaseOutput]:
+    """
+    Build ``ReleaseOutput``s for bundles in either storage mode, resolving
+    every deduplicated component with at most one query per batch of ids
+    not already cached.
+    """
+    resolved = _resolve(
+        session,
+        (
+            component_id
+            for bundle in bundles
+            if bundle.versions is None and bundle.component_ids
+            for component_id in bundle.component_ids
+        ),
+    )
+    outputs = []
+    for bundle in bundles:
+        versions = bundle.versions
+        if versions is None:
+            versions = dict(
+                resolved[component_id]
+                for component_id in bundle.component_ids or ()
+            )
+        outputs.append(
+            ReleaseOutput(
+                deployment_id=bundle.deployment_id,
+                environment=bundle.environment,
+                versions=versions,
+                timestamp=bundle.timestamp,
+            )
+        )
+    return outputs
+
+
+def ensure_component_ids_column(engine: Engine) -> None:
+    """Add ``releasebundle.component_ids`` to databases created before it."""
+    table = ReleaseBundle.__tablename__
+    columns = {column["name"] for column in inspect(engine).get_columns(table)}
+    if "component_ids" not in columns:
+        with engine.begin() as connection:
+            connection.execute(
+                text(f"ALTER TABLE {table} ADD COLUMN component_ids JSON")
+            )
+        logger.info("added component_ids column", extra={"table": table})
+
+
+def convert_storage(
+    session: Session, mode: str, chunk_size: int = 1000
+) -> int:
+    """
+    Rewrite every bundle not yet in ``mode`` to that storage mode, one
+    committed chunk at a time. Returns the number of bundles converted.
+    """
+    if mode == STORAGE_DEDUP:
+        pending = ReleaseBundle.component_ids.is_(None)
+    else:
+        pending = ReleaseBundle.versions.is_(None)
+
+    converted = 0
+    while True:
+        bundles = session.exec(
+            select(ReleaseBundle).where(pending).limit(chunk_size)
+        ).all()
+        if not bundles:
+            break
+        if mode == STORAGE_DEDUP:
+            ids = intern_pairs(
+                session,
+                (
+                    pair
+                    for bundle in bundles
+                    for pair in bundle.versions.items()
+                ),
+            )
+            for bundle in bundles:
+                bundle.component_ids = [
+                    ids[pair] for pair in sorted(bundle.versions.items())
+                ]
+                bundle.versions = None
+        else:
+            for bundle, output in zip(
+                bundles, hydrate_releases(session, bundles)
+            ):
+                bundle.versions = output.versions
+                bundle.component_ids = None
+        session.add_all(bundles)
+        session.commit()
+        session.expunge_all()
+        converted += len(bundles)
+        logger.info(
+            "converted release bundles",
+            extra={"count": converted, "mode": mode},
+        )
+    return converted
+
+
+def main(argv: list[str] | None = None) -> None:
+    from sqlmodel import SQLModel
+
+    from database.session import create_db_engine
+    from utils.config import get_settings
+    from utils.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(
+        prog="python -m database.version_store",
+        description="Convert stored release versions between modes.",
+    )
+    parser.add_argument(
+        "--to", choices=(STORAGE_DEDUP, STORAGE_INLINE), default=STORAGE_DEDUP
+    )
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    configure_logging(level=settings.logging_level)
+    engine = create_db_engine(settings.database_url, echo=settings.sql_echo)
+    SQLModel.metadata.create_all(engine)
+    ensure_component_ids_column(engine)
+    with Session(engine) as session:
+        convert_storage(session, args.to, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,14 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 import logging
+import sys
 import time
-from fastapi import Depends, FastAPI, HTTPException, Request, status
-from prometheus_fastapi_instrumentator import Instrumentator
-from starlette.responses import RedirectResponse
-import uvicorn
-from utils.config import Settings, get_settings
-from database.healthcheck import HealthStatus
-from database.session import get_session
-from database.session import init_db
-from routers import releases
-from models.status_output import StatusOutput
+from typing import TYPE_CHECKING
 from utils.logging_config import configure_logging
-from sqlmodel import Session as SQLSession
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+    from utils.config import Settings
 
 
 logger = logging.getLogger(__name__)
@@ -22,20 +18,94 @@ def _configure_logging(level: str) -> None:
     configure_logging(level=level)
 
 
-def create_app(settings: Settings | None = None) -> FastAPI:
+def create_app(settings: "Settings | None" = None) -> "FastAPI":
+    # The web stack is imported here rather than at module level so that
+    # ``import main`` stays cheap for the CLI entry points.
+    from fastapi import Depends, FastAPI, HTTPException, Request, status
+    from prometheus_fastapi_instrumentator import Instrumentator
+    from starlette.responses import RedirectResponse
+    from sqlmodel import Session as SQLSession
+    from utils.config import get_settings
+    from database.archive import ReleaseArchive, run_archive_loop
+    from database.healthcheck import HealthStatus
+    from database.retention import run_retention_loop
+    from database.session import get_session, init_db, run_prewarm_pool
+    from models.status_output import StatusOutput
+    from routers import releases, stream
+    from utils.broadcaster import ReleaseBroadcaster
+    from utils.compression import CompressionMiddleware
+    from utils.history_snapshots import HistorySnapshots
+
     app_settings = settings or get_settings()
     _configure_logging(app_settings.logging_level)
+    archive = (
+        ReleaseArchive(app_settings.archive_dir)
+        if app_settings.archive_dir
+        else None
+    )
+    history_snapshots = (
+        HistorySnapshots(
+            app_settings.history_snapshot_max_bytes,
+            app_settings.compression_minimum_size,
+            app_settings.compression_level,
+        )
+        if app_settings.history_snapshot_max_bytes > 0
+        else None
+    )
 
     @asynccontextmanager
     async def lifespan(app: FastAPI):
-        init_db(app_settings.database_url, echo=app_settings.sql_echo)
+        init_db(
+            app_settings.database_url,
+            echo=app_settings.sql_echo,
+            fast_start=app_settings.fast_start,
+        )
+        background_tasks = []
+        if app_settings.fast_start:
+            background_tasks.append(
+                asyncio.create_task(run_prewarm_pool())
+            )
+        if app_settings.retention_days:
+            background_tasks.append(
+                asyncio.create_task(
+                    run_retention_loop(
+                        app_settings.retention_days,
+                        app_settings.retention_interval_seconds,
+                        app_settings.delete_chunk_size,
+                        history_snapshots,
+                    )
+                )
+            )
+        if archive is not None and app_settings.archive_writer:
+            background_tasks.append(
+                asyncio.create_task(
+                    run_archive_loop(
+                        archive,
+                        app_settings.archive_after_days,
+                        app_settings.archive_interval_seconds,
+                        app_settings.delete_chunk_size,
+                    )
+                )
+            )
         yield
+        for task in background_tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
 
     app = FastAPI(
         title="Airia Release Store",
         lifespan=lifespan,
     )
     app.state.settings = app_settings
+    app.state.archive = archive
+    app.state.broadcaster = ReleaseBroadcaster(app_settings.stream_queue_size)
+    app.state.history_snapshots = history_snapshots
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=app_settings.compression_minimum_size,
+        level=app_settings.compression_level,
+    )
 
     @app.middleware("http")
     async def log_requests(request: Request, call_next):
@@ -96,6 +166,7 @@ def create_app(settings: Settings | None = None) -> FastAPI:
             )
 
     app.include_router(releases.router)
+    app.include_router(stream.router)
 
     # Expose Prometheus metrics and tag them for docs clarity
     Instrumentator().instrument(app).expose(
@@ -104,10 +175,23 @@ def create_app(settings: Settings | None = None) -> FastAPI:
     return app
 
 
-app = create_app()
+_app = None
+
+
+def __getattr__(name: str):
+    # ``main:app`` is built on first access rather than at import time, so
+    # ``python -m main`` and ``import main`` from tooling don't pay for it.
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def main():
+    import uvicorn
+
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -118,5 +202,15 @@ def main():
     )
 
 
+def import_releases(argv: list[str] | None = None):
+    """Bulk load a release dump: ``python -m main import dump.ndjson``."""
+    from database.bulk_import import main as bulk_import_main
+
+    bulk_import_main(argv)
+
+
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:2] == ["import"]:
+        import_releases(sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class RangeDeleteOutput(BaseModel):
+    status: str
+    environment: str
+    deleted: int
@@ -0,0 +1,11 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from models.release_output import ReleaseOutput
+
+
+class ReleaseAtOutput(BaseModel):
+    ts: datetime
+    release: Optional[ReleaseOutput]
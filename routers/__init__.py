@@ -1,3 +1,3 @@
-from . import releases
+from . import releases, stream
 
-__all__ = ["releases"]
+__all__ = ["releases", "stream"]
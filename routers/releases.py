@@ -1,20 +1,47 @@
 from datetime import datetime
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from pydantic import ValidationError
-from sqlalchemy import func
+from sqlalchemy import DateTime, Integer, func, literal, union_all
+from sqlalchemy.orm import aliased
 from sqlmodel import Session, select
 
+from database.archive import ReleaseArchive, count_hot_duplicates
 from database.releasebundle import ReleaseBundle
+from database.rollup import (
+    count_releases,
+    record_release_created,
+    record_release_deleted,
+    utc_naive,
+)
+from database.retention import delete_releases_in_range
 from database.session import get_session
-from utils.dependencies import require_basic_auth
+from database.snapshot_generation import (
+    bump_history_generation,
+    history_generation,
+)
+from database.version_store import hydrate_releases, store_versions
+from utils.broadcaster import ReleaseBroadcaster
+from utils.compression import negotiate_encoding
+from utils.config import Settings
+from utils.dependencies import (
+    get_app_settings,
+    get_archive,
+    get_broadcaster,
+    get_history_snapshots,
+    require_basic_auth,
+)
+from utils.history_snapshots import HistorySnapshots
 from models.release import Release
 from models.delete_output import DeleteOutput
+from models.range_delete_output import RangeDeleteOutput
 from models.timespan import Timespan
 from models.release_output import ReleaseOutput
 from models.count_output import CountOutput
+from models.release_at_output import ReleaseAtOutput
 from utils.bundle_id import gen_release_bundle_hash
 
 router = APIRouter(
@@ -25,11 +52,37 @@ router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
+MAX_POINT_IN_TIME_LOOKUPS = 500
+
+
+def _parse_timespan(start_date: datetime, end_date: datetime) -> Timespan:
+    try:
+        span = Timespan(start_date=start_date, end_date=end_date)
+    except ValidationError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail=jsonable_encoder(exc.errors()),
+        )
+    # Timestamps are stored as naive UTC and SQLite drops the offset of a
+    # bound aware datetime, so every query gets naive UTC bounds.
+    return Timespan(
+        start_date=utc_naive(span.start_date),
+        end_date=utc_naive(span.end_date),
+    )
+
+
+def _escape_like(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    )
+
 
 @router.post("/create", response_model=ReleaseOutput)
 def create_release(
     release: Release,
     session: Session = Depends(get_session),
+    broadcaster: ReleaseBroadcaster = Depends(get_broadcaster),
+    settings: Settings = Depends(get_app_settings),
 ):
     release_id = gen_release_bundle_hash(release.environment, release.versions)
     existing = session.get(ReleaseBundle, release_id)
@@ -49,9 +102,12 @@ def create_release(
     release_bundle = ReleaseBundle(
         deployment_id=release_id,
         environment=release.environment,
-        versions=release.versions,
+    )
+    store_versions(
+        session, release_bundle, release.versions, settings.versions_storage
     )
     session.add(release_bundle)
+    record_release_created(session, release_bundle)
     session.commit()
     session.refresh(release_bundle)
     logger.info(
@@ -61,12 +117,15 @@ def create_release(
             "deployment_id": release_id,
         },
     )
-    return ReleaseOutput.model_validate(release_bundle, from_attributes=True)
+    output = hydrate_releases(session, [release_bundle])[0]
+    broadcaster.publish(output)
+    return output
 
 
 @router.get("/history/{environment}", response_model=list[ReleaseOutput])
 def get_release_history(
     environment: str,
+    request: Request,
     start_date: datetime = Query(
         ..., description="ISO 8601 datetime (e.g., 2024-01-01T00:00:00Z)"
     ),
@@ -74,14 +133,26 @@ def get_release_history(
         ..., description="ISO 8601 datetime (e.g., 2024-01-31T23:59:59Z)"
     ),
     session: Session = Depends(get_session),
+    archive: ReleaseArchive | None = Depends(get_archive),
+    snapshots: HistorySnapshots | None = Depends(get_history_snapshots),
 ):
-    try:
-        span = Timespan(start_date=start_date, end_date=end_date)
-    except ValidationError as exc:
-        raise HTTPException(
-            status_code=400,
-            detail=jsonable_encoder(exc.errors()),
+    span = _parse_timespan(start_date, end_date)
+
+    cacheable = snapshots is not None and snapshots.is_closed(span.end_date)
+    if cacheable:
+        generation = history_generation(session, environment)
+        encoding = negotiate_encoding(
+            request.headers.get("accept-encoding", "")
+        )
+        cached = snapshots.get(
+            environment, span.start_date, span.end_date, encoding, generation
         )
+        if cached is not None:
+            logger.info(
+                "served release history snapshot",
+                extra={"environment": environment},
+            )
+            return snapshots.response(*cached)
 
     statement = (
         select(ReleaseBundle)
@@ -90,7 +161,19 @@ def get_release_history(
         .where(ReleaseBundle.timestamp <= span.end_date)
         .order_by(ReleaseBundle.timestamp.desc())
     )
-    results = session.exec(statement).all()
+    results = hydrate_releases(session, session.exec(statement).all())
+    if archive is not None:
+        archived = archive.history(
+            environment, span.start_date, span.end_date
+        )
+        if archived:
+            seen = {item.deployment_id for item in results}
+            results.extend(
+                ReleaseOutput.model_validate(record)
+                for record in archived
+                if record["deployment_id"] not in seen
+            )
+            results.sort(key=lambda item: item.timestamp, reverse=True)
     logger.info(
         "fetched release history",
         extra={
@@ -98,39 +181,137 @@ def get_release_history(
             "count": len(results),
         },
     )
-    return [
-        ReleaseOutput.model_validate(item, from_attributes=True)
-        for item in results
-    ]
+    if cacheable:
+        body, coding = snapshots.put(
+            environment,
+            span.start_date,
+            span.end_date,
+            JSONResponse(jsonable_encoder(results)).body,
+            encoding,
+            generation,
+        )
+        return snapshots.response(body, coding)
+    return results
 
 
-@router.get("/history/{environment}/count", response_model=CountOutput)
-def get_release_history_count(
-    environment: str,
+@router.get("/history", response_model=dict[str, list[ReleaseOutput]])
+def get_multi_environment_history(
+    environment: list[str] = Query(
+        default=[], description="Environment to include; repeatable"
+    ),
+    prefix: str | None = Query(
+        default=None, description="Include every environment with this prefix"
+    ),
     start_date: datetime = Query(
         ..., description="ISO 8601 datetime (e.g., 2024-01-01T00:00:00Z)"
     ),
     end_date: datetime = Query(
         ..., description="ISO 8601 datetime (e.g., 2024-01-31T23:59:59Z)"
     ),
+    limit: int | None = Query(
+        default=None, ge=1, description="Latest N releases per environment"
+    ),
     session: Session = Depends(get_session),
+    archive: ReleaseArchive | None = Depends(get_archive),
 ):
-    try:
-        span = Timespan(start_date=start_date, end_date=end_date)
-    except ValidationError as exc:
+    if not environment and prefix is None:
         raise HTTPException(
             status_code=400,
-            detail=jsonable_encoder(exc.errors()),
+            detail="Provide at least one environment or a prefix.",
+        )
+    span = _parse_timespan(start_date, end_date)
+
+    if environment:
+        env_filter = ReleaseBundle.environment.in_(environment)
+    else:
+        env_filter = ReleaseBundle.environment.like(
+            f"{_escape_like(prefix)}%", escape="\\"
         )
 
     statement = (
-        select(func.count())
-        .select_from(ReleaseBundle)
-        .where(ReleaseBundle.environment == environment)
+        select(ReleaseBundle)
+        .where(env_filter)
         .where(ReleaseBundle.timestamp >= span.start_date)
         .where(ReleaseBundle.timestamp <= span.end_date)
     )
-    count = session.exec(statement).one()
+    if limit is not None:
+        ranked = statement.add_columns(
+            func.row_number()
+            .over(
+                partition_by=ReleaseBundle.environment,
+                order_by=ReleaseBundle.timestamp.desc(),
+            )
+            .label("row_number")
+        ).subquery()
+        bundle = aliased(ReleaseBundle, ranked)
+        statement = (
+            select(bundle)
+            .where(ranked.c.row_number <= limit)
+            .order_by(bundle.environment, bundle.timestamp.desc())
+        )
+    else:
+        statement = statement.order_by(
+            ReleaseBundle.environment, ReleaseBundle.timestamp.desc()
+        )
+    results = hydrate_releases(session, session.exec(statement).all())
+
+    grouped: dict[str, list[ReleaseOutput]] = {
+        name: [] for name in environment
+    }
+    for item in results:
+        grouped.setdefault(item.environment, []).append(item)
+    if archive is not None:
+        names = environment or [
+            name
+            for name in archive.environments()
+            if name.startswith(prefix)
+        ]
+        for name in names:
+            archived = archive.history(name, span.start_date, span.end_date)
+            if not archived:
+                continue
+            items = grouped.setdefault(name, [])
+            seen = {item.deployment_id for item in items}
+            items.extend(
+                ReleaseOutput.model_validate(record)
+                for record in archived
+                if record["deployment_id"] not in seen
+            )
+            items.sort(key=lambda item: item.timestamp, reverse=True)
+            if limit is not None:
+                del items[limit:]
+    logger.info(
+        "fetched multi-environment release history",
+        extra={
+            "environments": sorted(grouped),
+            "count": sum(len(items) for items in grouped.values()),
+        },
+    )
+    return grouped
+
+
+@router.get("/history/{environment}/count", response_model=CountOutput)
+def get_release_history_count(
+    environment: str,
+    start_date: datetime = Query(
+        ..., description="ISO 8601 datetime (e.g., 2024-01-01T00:00:00Z)"
+    ),
+    end_date: datetime = Query(
+        ..., description="ISO 8601 datetime (e.g., 2024-01-31T23:59:59Z)"
+    ),
+    session: Session = Depends(get_session),
+    archive: ReleaseArchive | None = Depends(get_archive),
+):
+    span = _parse_timespan(start_date, end_date)
+
+    count = count_releases(
+        session, environment, span.start_date, span.end_date
+    )
+    if archive is not None:
+        count += archive.count(environment, span.start_date, span.end_date)
+        count -= count_hot_duplicates(
+            session, archive, environment, span.start_date, span.end_date
+        )
     logger.info(
         "fetched release count",
         extra={"environment": environment, "count": count},
@@ -138,10 +319,127 @@ def get_release_history_count(
     return CountOutput(environment=environment, count=count)
 
 
+@router.get("/at/{environment}", response_model=ReleaseOutput)
+def get_release_at(
+    environment: str,
+    ts: datetime = Query(
+        ..., description="ISO 8601 datetime (e.g., 2024-01-01T00:00:00Z)"
+    ),
+    session: Session = Depends(get_session),
+    archive: ReleaseArchive | None = Depends(get_archive),
+):
+    statement = (
+        select(ReleaseBundle)
+        .where(ReleaseBundle.environment == environment)
+        .where(ReleaseBundle.timestamp <= utc_naive(ts))
+        .order_by(ReleaseBundle.timestamp.desc())
+        .limit(1)
+    )
+    release_bundle = session.exec(statement).first()
+    release = (
+        hydrate_releases(session, [release_bundle])[0]
+        if release_bundle
+        else None
+    )
+    if archive is not None:
+        archived = archive.latest_at(
+            environment, [(ts, release.timestamp if release else None)]
+        )[0]
+        if archived is not None:
+            release = ReleaseOutput.model_validate(archived)
+    if release is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No release found in {environment} at or before {ts}.",
+        )
+    logger.info(
+        "fetched release at point in time",
+        extra={
+            "environment": environment,
+            "deployment_id": release.deployment_id,
+        },
+    )
+    return release
+
+
+@router.get("/at/{environment}/batch", response_model=list[ReleaseAtOutput])
+def get_releases_at(
+    environment: str,
+    ts: list[datetime] = Query(
+        ..., description="ISO 8601 datetime; repeatable"
+    ),
+    session: Session = Depends(get_session),
+    archive: ReleaseArchive | None = Depends(get_archive),
+):
+    if len(ts) > MAX_POINT_IN_TIME_LOOKUPS:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"At most {MAX_POINT_IN_TIME_LOOKUPS} timestamps may be "
+                "requested at once."
+            ),
+        )
+
+    points = union_all(
+        *(
+            select(
+                literal(position, Integer).label("position"),
+                literal(utc_naive(point), DateTime).label("ts"),
+            )
+            for position, point in enumerate(ts)
+        )
+    ).subquery("points")
+    latest_id = (
+        select(ReleaseBundle.deployment_id)
+        .where(ReleaseBundle.environment == environment)
+        .where(ReleaseBundle.timestamp <= points.c.ts)
+        .order_by(ReleaseBundle.timestamp.desc())
+        .limit(1)
+        .correlate(points)
+        .scalar_subquery()
+    )
+    statement = (
+        select(points.c.position, ReleaseBundle)
+        .select_from(points)
+        .outerjoin(ReleaseBundle, ReleaseBundle.deployment_id == latest_id)
+        .order_by(points.c.position)
+    )
+    results = session.exec(statement).all()
+    hydrated = iter(
+        hydrate_releases(
+            session, [item for _, item in results if item is not None]
+        )
+    )
+    releases = [
+        next(hydrated) if item is not None else None for _, item in results
+    ]
+    if archive is not None:
+        archived = archive.latest_at(
+            environment,
+            [
+                (ts[position], release.timestamp if release else None)
+                for (position, _), release in zip(results, releases)
+            ],
+        )
+        releases = [
+            ReleaseOutput.model_validate(record) if record else release
+            for record, release in zip(archived, releases)
+        ]
+    logger.info(
+        "fetched releases at points in time",
+        extra={"environment": environment, "count": len(results)},
+    )
+    return [
+        ReleaseAtOutput(ts=ts[position], release=release)
+        for (position, _), release in zip(results, releases)
+    ]
+
+
 @router.delete("/delete/{deployment_id}", response_model=DeleteOutput)
 def delete_release(
     deployment_id: str,
     session: Session = Depends(get_session),
+    snapshots: HistorySnapshots | None = Depends(get_history_snapshots),
 ):
     release_bundle = session.get(ReleaseBundle, deployment_id)
     if not release_bundle:
@@ -156,9 +454,51 @@ def delete_release(
             ),
         )
     session.delete(release_bundle)
+    record_release_deleted(session, release_bundle)
+    bump_history_generation(session, release_bundle.environment)
     session.commit()
+    if snapshots is not None:
+        snapshots.invalidate(
+            release_bundle.environment,
+            release_bundle.timestamp,
+            release_bundle.timestamp,
+        )
     logger.info(
         "deleted release successfully",
         extra={"deployment_id": deployment_id},
     )
     return DeleteOutput(status="deleted", deployment_id=deployment_id)
+
+
+@router.delete(
+    "/delete/range/{environment}", response_model=RangeDeleteOutput
+)
+def delete_release_range(
+    environment: str,
+    start_date: datetime = Query(
+        ..., description="ISO 8601 datetime (e.g., 2024-01-01T00:00:00Z)"
+    ),
+    end_date: datetime = Query(
+        ..., description="ISO 8601 datetime (e.g., 2024-01-31T23:59:59Z)"
+    ),
+    session: Session = Depends(get_session),
+    settings: Settings = Depends(get_app_settings),
+    snapshots: HistorySnapshots | None = Depends(get_history_snapshots),
+):
+    span = _parse_timespan(start_date, end_date)
+    deleted = delete_releases_in_range(
+        session,
+        environment,
+        span.start_date,
+        span.end_date,
+        chunk_size=settings.delete_chunk_size,
+    )
+    if deleted and snapshots is not None:
+        snapshots.invalidate(environment, span.start_date, span.end_date)
+    logger.info(
+        "deleted release range",
+        extra={"environment": environment, "count": deleted},
+    )
+    return RangeDeleteOutput(
+        status="deleted", environment=environment, deleted=deleted
+    )
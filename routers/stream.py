@@ -0,0 +1,151 @@
+from datetime import datetime, timezone
+import json
+import logging
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import StreamingResponse
+from sqlmodel import Session, select
+
+from database import session as db_session
+from database.releasebundle import ReleaseBundle
+from database.version_store import hydrate_releases
+from models.release_output import ReleaseOutput
+from utils.broadcaster import ReleaseBroadcaster, stream_connections
+from utils.config import Settings
+from utils.dependencies import (
+    get_app_settings,
+    get_broadcaster,
+    require_basic_auth,
+)
+
+router = APIRouter(
+    prefix="/api/v1/release",
+    tags=["Release Stream API"],
+    dependencies=[Depends(require_basic_auth)],
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_POLL_SECONDS = 60.0
+
+
+def _cursor(timestamp: datetime) -> str:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc).isoformat()
+
+
+def _releases_since(environment: str, since: datetime) -> list[ReleaseOutput]:
+    # Streams outlive requests, so use a short session per catch-up query
+    # instead of holding a pooled connection for the whole connection.
+    if db_session.engine is None:
+        raise RuntimeError("Database engine is not initialized")
+    with Session(db_session.engine) as session:
+        statement = (
+            select(ReleaseBundle)
+            .where(ReleaseBundle.environment == environment)
+            .where(ReleaseBundle.timestamp > since)
+            .order_by(ReleaseBundle.timestamp)
+        )
+        return hydrate_releases(session, session.exec(statement).all())
+
+
+def _sse_event(release: ReleaseOutput) -> str:
+    data = json.dumps(jsonable_encoder(release))
+    return (
+        f"id: {_cursor(release.timestamp)}\n"
+        f"event: release\n"
+        f"data: {data}\n\n"
+    )
+
+
+@router.get("/stream/{environment}")
+async def stream_releases(
+    environment: str,
+    request: Request,
+    since: datetime | None = Query(
+        default=None,
+        description="Replay releases created after this ISO 8601 datetime",
+    ),
+    last_event_id: str | None = Header(default=None),
+    broadcaster: ReleaseBroadcaster = Depends(get_broadcaster),
+    settings: Settings = Depends(get_app_settings),
+):
+    if since is None and last_event_id:
+        try:
+            since = datetime.fromisoformat(last_event_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=400, detail="Invalid Last-Event-ID."
+            )
+
+    async def events():
+        # Subscribing here rather than in the handler ties the subscription
+        # to the body actually being streamed; it still happens before the
+        # replay, so nothing committed in between is lost.
+        subscription = broadcaster.subscribe(environment)
+        stream_connections.labels(mode="sse").inc()
+        sent: set[str] = set()
+        try:
+            if since is not None:
+                for release in await run_in_threadpool(
+                    _releases_since, environment, since
+                ):
+                    sent.add(release.deployment_id)
+                    yield _sse_event(release)
+            while not await request.is_disconnected():
+                try:
+                    release = await subscription.get(
+                        settings.stream_keepalive_seconds
+                    )
+                except OverflowError:
+                    yield ": dropped, reconnect with Last-Event-ID\n\n"
+                    return
+                if release is None:
+                    yield ": keep-alive\n\n"
+                elif release.deployment_id not in sent:
+                    yield _sse_event(release)
+        finally:
+            broadcaster.unsubscribe(subscription)
+            stream_connections.labels(mode="sse").dec()
+
+    logger.info("opened release stream", extra={"environment": environment})
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stream/{environment}/poll", response_model=list[ReleaseOutput])
+async def poll_releases(
+    environment: str,
+    since: datetime = Query(
+        ..., description="Return releases created after this ISO 8601 datetime"
+    ),
+    timeout: float = Query(
+        default=30.0,
+        ge=0,
+        le=MAX_POLL_SECONDS,
+        description="Seconds to wait for a new release",
+    ),
+    broadcaster: ReleaseBroadcaster = Depends(get_broadcaster),
+):
+    subscription = broadcaster.subscribe(environment)
+    stream_connections.labels(mode="long_poll").inc()
+    try:
+        releases = await run_in_threadpool(
+            _releases_since, environment, since
+        )
+        if releases or timeout == 0:
+            return releases
+        try:
+            release = await subscription.get(timeout)
+        except OverflowError:
+            release = None
+        return [release] if release is not None else []
+    finally:
+        broadcaster.unsubscribe(subscription)
+        stream_connections.labels(mode="long_poll").dec()
@@ -1,7 +1,12 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+import json
+import logging
 import os
 from pathlib import Path
 import sys
+import time
 
 import pytest
 from fastapi.testclient import TestClient
@@ -13,11 +18,34 @@ if str(ROOT) not in sys.path:
 os.environ.setdefault("BASIC_AUTH_PASSWORD", "testpass")
 
 from database import session as db_session  # noqa: E402
+from database.archive import (  # noqa: E402
+    ReleaseArchive,
+    archive_old_releases,
+)
+from database import bulk_import  # noqa: E402
+from database.bulk_import import import_releases  # noqa: E402
+from database.componentversion import ComponentVersion  # noqa: E402
 from database.healthcheck import HealthStatus  # noqa: E402
+from database.releasebundle import ReleaseBundle  # noqa: E402
+from database.releasedailycount import ReleaseDailyCount  # noqa: E402
+from database.retention import apply_retention_policy  # noqa: E402
+from database.rollup import (  # noqa: E402
+    record_release_created,
+    rebuild_daily_counts,
+)
+from database.version_store import (  # noqa: E402
+    _ComponentCache,
+    convert_storage,
+    hydrate_releases,
+)
 from main import create_app  # noqa: E402
-from sqlmodel import Session as SQLSession  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+from sqlmodel import Session as SQLSession, SQLModel, select  # noqa: E402
+from models.release_output import ReleaseOutput  # noqa: E402
+from utils.broadcaster import ReleaseBroadcaster  # noqa: E402
 from utils.bundle_id import gen_release_bundle_hash  # noqa: E402
 from utils.config import Settings  # noqa: E402
+from utils.history_snapshots import HistorySnapshots  # noqa: E402
 
 
 @pytest.fixture
@@ -217,3 +245,875 @@ def test_metrics_endpoint(client):
         "http_requests_total" in resp.text
         or "process_resident_memory_bytes" in resp.text
     )
+
+
+def _seed_bundles(environment, timestamps):
+    with SQLSession(db_session.engine) as session:
+        for index, timestamp in enumerate(timestamps):
+            versions = {"svc": f"0.0.{index}"}
+            bundle = ReleaseBundle(
+                deployment_id=gen_release_bundle_hash(environment, versions),
+                environment=environment,
+                versions=versions,
+                timestamp=timestamp,
+            )
+            session.add(bundle)
+            record_release_created(session, bundle)
+        session.commit()
+
+
+def test_count_uses_daily_rollup_across_days(client):
+    base = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    timestamps = [base + timedelta(hours=7 * i) for i in range(40)]
+    _seed_bundles("rollup", timestamps)
+
+    start = base + timedelta(hours=5)
+    end = base + timedelta(days=9, hours=3)
+    expected = sum(1 for ts in timestamps if start <= ts <= end)
+
+    resp = client.get(
+        "/api/v1/release/history/rollup/count",
+        params={"start_date": start.isoformat(), "end_date": end.isoformat()},
+        auth=auth(),
+    )
+    assert resp.status_code == 200
+    assert resp.json()["count"] == expected
+
+    history = client.get(
+        "/api/v1/release/history/rollup",
+        params={"start_date": start.isoformat(), "end_date": end.isoformat()},
+        auth=auth(),
+    )
+    deleted = client.delete(
+        f"/api/v1/release/delete/{history.json()[3]['deployment_id']}",
+        auth=auth(),
+    )
+    assert deleted.status_code == 200
+
+    resp = client.get(
+        "/api/v1/release/history/rollup/count",
+        params={"start_date": start.isoformat(), "end_date": end.isoformat()},
+        auth=auth(),
+    )
+    assert resp.json()["count"] == expected - 1
+
+
+def test_rebuild_daily_counts(client):
+    base = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    timestamps = [base + timedelta(hours=10 * i) for i in range(8)]
+    _seed_bundles("rebuild", timestamps)
+
+    with SQLSession(db_session.engine) as session:
+        before = {
+            (row.environment, row.day): row.count
+            for row in session.exec(select(ReleaseDailyCount)).all()
+        }
+        session.exec(delete(ReleaseDailyCount))
+        session.commit()
+
+        rebuild_daily_counts(session)
+        after = {
+            (row.environment, row.day): row.count
+            for row in session.exec(select(ReleaseDailyCount)).all()
+        }
+    assert after == before
+    assert sum(after.values()) == 8
+
+
+def test_startup_backfills_rollup_for_existing_rows(test_settings):
+    engine = db_session.create_db_engine(test_settings.database_url)
+    SQLModel.metadata.create_all(engine, tables=[ReleaseBundle.__table__])
+    base = datetime(2024, 3, 1)
+    with SQLSession(engine) as session:
+        for index in range(10):
+            versions = {"svc": f"0.0.{index}"}
+            session.add(
+                ReleaseBundle(
+                    deployment_id=gen_release_bundle_hash("legacy", versions),
+                    environment="legacy",
+                    versions=versions,
+                    timestamp=base + timedelta(hours=11 * index),
+                )
+            )
+        session.commit()
+    engine.dispose()
+
+    with TestClient(create_app(test_settings)) as upgraded:
+        resp = upgraded.get(
+            "/api/v1/release/history/legacy/count",
+            params={
+                "start_date": "2024-03-01T00:00:00Z",
+                "end_date": "2024-03-31T00:00:00Z",
+            },
+            auth=auth(),
+        )
+    assert resp.json()["count"] == 10
+
+
+def test_offset_windows_agree_between_history_and_count(client):
+    base = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    _seed_bundles("offset", [base + timedelta(hours=7 * i) for i in range(40)])
+    offset = timezone(timedelta(hours=5))
+    for start_hour, hours in ((3, 30), (20, 50), (0, 72), (41, 100)):
+        start = (base + timedelta(hours=start_hour)).astimezone(offset)
+        window = {
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(hours=hours)).isoformat(),
+        }
+        history = client.get(
+            "/api/v1/release/history/offset", params=window, auth=auth()
+        )
+        count = client.get(
+            "/api/v1/release/history/offset/count", params=window, auth=auth()
+        )
+        assert len(history.json()) == count.json()["count"]
+
+
+def test_multi_environment_history(client):
+    base = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    for environment in ("multi-dev", "multi-staging", "multi-prod"):
+        _seed_bundles(
+            environment, [base + timedelta(hours=i) for i in range(5)]
+        )
+    params = {
+        "start_date": base.isoformat(),
+        "end_date": (base + timedelta(days=1)).isoformat(),
+    }
+
+    resp = client.get(
+        "/api/v1/release/history",
+        params={
+            **params,
+            "environment": ["multi-dev", "multi-prod", "multi-empty"],
+        },
+        auth=auth(),
+    )
+    assert resp.status_code == 200
+    grouped = resp.json()
+    assert set(grouped) == {"multi-dev", "multi-prod", "multi-empty"}
+    assert len(grouped["multi-dev"]) == 5
+    assert grouped["multi-empty"] == []
+
+    resp = client.get(
+        "/api/v1/release/history",
+        params={**params, "prefix": "multi-", "limit": 2},
+        auth=auth(),
+    )
+    assert resp.status_code == 200
+    grouped = resp.json()
+    assert set(grouped) == {"multi-dev", "multi-staging", "multi-prod"}
+    latest = grouped["multi-staging"]
+    assert len(latest) == 2
+    assert latest[0]["timestamp"] > latest[1]["timestamp"]
+    assert latest[0]["timestamp"].startswith("2024-06-01T04:00:00")
+
+    missing = client.get("/api/v1/release/history", params=params, auth=auth())
+    assert missing.status_code == 400
+
+
+def test_release_at_point_in_time(client):
+    base = datetime(2024, 7, 1, tzinfo=timezone.utc)
+    _seed_bundles("pit", [base + timedelta(hours=i) for i in range(3)])
+
+    resp = client.get(
+        "/api/v1/release/at/pit",
+        params={"ts": (base + timedelta(hours=1, minutes=30)).isoformat()},
+        auth=auth(),
+    )
+    assert resp.status_code == 200
+    assert resp.json()["versions"] == {"svc": "0.0.1"}
+
+    before = client.get(
+        "/api/v1/release/at/pit",
+        params={"ts": (base - timedelta(hours=1)).isoformat()},
+        auth=auth(),
+    )
+    assert before.status_code == 404
+
+    points = [
+        base + timedelta(hours=5),
+        base - timedelta(minutes=1),
+        base,
+    ]
+    batch = client.get(
+        "/api/v1/release/at/pit/batch",
+        params={"ts": [point.isoformat() for point in points]},
+        auth=auth(),
+    )
+    assert batch.status_code == 200
+    rows = batch.json()
+    assert len(rows) == 3
+    assert rows[0]["release"]["versions"] == {"svc": "0.0.2"}
+    assert rows[1]["release"] is None
+    assert rows[2]["release"]["versions"] == {"svc": "0.0.0"}
+
+
+def test_delete_release_range(test_settings):
+    test_settings.delete_chunk_size = 3
+    app = create_app(test_settings)
+    with TestClient(app) as range_client:
+        base = datetime(2024, 8, 1, tzinfo=timezone.utc)
+        _seed_bundles("prune", [base + timedelta(hours=i) for i in range(10)])
+        window = {
+            "start_date": (base + timedelta(hours=2)).isoformat(),
+            "end_date": (base + timedelta(hours=8)).isoformat(),
+        }
+
+        resp = range_client.delete(
+            "/api/v1/release/delete/range/prune", params=window, auth=auth()
+        )
+        assert resp.status_code == 200
+        assert resp.json()["deleted"] == 7
+
+        count = range_client.get(
+            "/api/v1/release/history/prune/count",
+            params={
+                "start_date": base.isoformat(),
+                "end_date": (base + timedelta(days=2)).isoformat(),
+            },
+            auth=auth(),
+        )
+        assert count.json()["count"] == 3
+
+
+def test_retention_policy_prunes_old_releases(client):
+    now = datetime(2024, 9, 30, tzinfo=timezone.utc)
+    _seed_bundles(
+        "preview-1", [now - timedelta(days=d) for d in (1, 10, 40)]
+    )
+    _seed_bundles("production", [now - timedelta(days=400)])
+
+    with SQLSession(db_session.engine) as session:
+        removed = apply_retention_policy(
+            session, {"preview-*": 7, "dev": 30}, now=now
+        )
+        remaining = session.exec(
+            select(ReleaseBundle).where(
+                ReleaseBundle.environment == "preview-1"
+            )
+        ).all()
+    assert removed == {"preview-1": 2}
+    assert len(remaining) == 1
+    assert "release_retention_deleted_total" in client.get("/metrics").text
+
+
+def test_archive_merges_history_and_count(test_settings, tmp_path):
+    test_settings.archive_dir = str(tmp_path / "archive")
+    # keep the background job away from the rows this test archives itself
+    test_settings.archive_after_days = 100_000
+    app = create_app(test_settings)
+    with TestClient(app) as archive_client:
+        base = datetime(2024, 1, 30, tzinfo=timezone.utc)
+        timestamps = [base + timedelta(hours=9 * i) for i in range(12)]
+        _seed_bundles("cold", timestamps)
+
+        cutoff = base + timedelta(days=3)
+        with SQLSession(db_session.engine) as session:
+            moved = archive_old_releases(
+                session, app.state.archive, cutoff, chunk_size=4
+            )
+            hot = session.exec(
+                select(ReleaseBundle).where(
+                    ReleaseBundle.environment == "cold"
+                )
+            ).all()
+        archived = sum(1 for ts in timestamps if ts < cutoff)
+        assert moved == {"cold": archived}
+        assert len(hot) == len(timestamps) - archived
+        assert list((tmp_path / "archive" / "cold").iterdir())
+
+        start = base + timedelta(hours=4)
+        end = base + timedelta(days=4)
+        window = {"start_date": start.isoformat(), "end_date": end.isoformat()}
+        expected = sorted(
+            (ts for ts in timestamps if start <= ts <= end), reverse=True
+        )
+
+        history = archive_client.get(
+            "/api/v1/release/history/cold", params=window, auth=auth()
+        )
+        assert history.status_code == 200
+        assert [
+            datetime.fromisoformat(item["timestamp"]).replace(
+                tzinfo=timezone.utc
+            )
+            for item in history.json()
+        ] == expected
+
+        count = archive_client.get(
+            "/api/v1/release/history/cold/count", params=window, auth=auth()
+        )
+        assert count.json()["count"] == len(expected)
+
+
+def _archive_everything(app, environment, timestamps):
+    _seed_bundles(environment, timestamps)
+    with SQLSession(db_session.engine) as session:
+        archive_old_releases(
+            session, app.state.archive, datetime.now(timezone.utc)
+        )
+
+
+def test_count_skips_rows_left_in_both_tiers(test_settings, tmp_path):
+    test_settings.archive_dir = str(tmp_path / "archive")
+    test_settings.archive_writer = False
+    app = create_app(test_settings)
+    with TestClient(app) as archive_client:
+        base = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        timestamps = [base + timedelta(hours=10 * i) for i in range(6)]
+        _archive_everything(app, "twice", timestamps)
+        # A run that failed after archiving but before deleting leaves
+        # the oldest rows in the hot table too.
+        _seed_bundles("twice", timestamps[:3])
+
+        window = {
+            "start_date": base.isoformat(),
+            "end_date": (base + timedelta(days=3)).isoformat(),
+        }
+        history = archive_client.get(
+            "/api/v1/release/history/twice", params=window, auth=auth()
+        )
+        count = archive_client.get(
+            "/api/v1/release/history/twice/count", params=window, auth=auth()
+        )
+    assert len(history.json()) == count.json()["count"] == 6
+
+
+def test_point_in_time_falls_back_to_archive(test_settings, tmp_path):
+    test_settings.archive_dir = str(tmp_path / "archive")
+    test_settings.archive_writer = False
+    app = create_app(test_settings)
+    with TestClient(app) as archive_client:
+        base = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        _archive_everything(
+            app, "idle", [base + timedelta(days=i) for i in range(3)]
+        )
+
+        now = datetime.now(timezone.utc).isoformat()
+        current = archive_client.get(
+            "/api/v1/release/at/idle", params={"ts": now}, auth=auth()
+        )
+        assert current.status_code == 200
+        assert current.json()["versions"] == {"svc": "0.0.2"}
+
+        # A newer hot release wins over the archive.
+        with SQLSession(db_session.engine) as session:
+            versions = {"svc": "hot"}
+            session.add(
+                ReleaseBundle(
+                    deployment_id=gen_release_bundle_hash("idle", versions),
+                    environment="idle",
+                    versions=versions,
+                    timestamp=base + timedelta(days=10),
+                )
+            )
+            session.commit()
+        points = [
+            base - timedelta(days=1),
+            base + timedelta(days=1, hours=1),
+            base + timedelta(days=11),
+        ]
+        batch = archive_client.get(
+            "/api/v1/release/at/idle/batch",
+            params=[("ts", point.isoformat()) for point in points],
+            auth=auth(),
+        )
+        assert batch.status_code == 200
+        assert [
+            item["release"] and item["release"]["versions"]["svc"]
+            for item in batch.json()
+        ] == [None, "0.0.1", "hot"]
+
+
+def test_multi_environment_history_merges_archive(test_settings, tmp_path):
+    test_settings.archive_dir = str(tmp_path / "archive")
+    test_settings.archive_writer = False
+    app = create_app(test_settings)
+    with TestClient(app) as archive_client:
+        base = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        _archive_everything(
+            app, "cold-prod", [base + timedelta(hours=i) for i in range(3)]
+        )
+        _seed_bundles("cold-dev", [base + timedelta(hours=1)])
+        window = {
+            "start_date": base.isoformat(),
+            "end_date": (base + timedelta(days=1)).isoformat(),
+        }
+
+        by_name = archive_client.get(
+            "/api/v1/release/history",
+            params={**window, "environment": ["cold-prod", "cold-dev"]},
+            auth=auth(),
+        )
+        assert {
+            name: len(items) for name, items in by_name.json().items()
+        } == {"cold-prod": 3, "cold-dev": 1}
+
+        by_prefix = archive_client.get(
+            "/api/v1/release/history",
+            params={**window, "prefix": "cold-", "limit": 2},
+            auth=auth(),
+        )
+        assert [
+            item["versions"]["svc"] for item in by_prefix.json()["cold-prod"]
+        ] == ["0.0.2", "0.0.1"]
+
+
+def test_archive_readers_use_committed_index(tmp_path, monkeypatch):
+    writer = ReleaseArchive(tmp_path)
+    reader = ReleaseArchive(tmp_path)
+    base = datetime(2024, 5, 1)
+    releases = [
+        ReleaseOutput(
+            deployment_id=str(index),
+            environment="shared",
+            versions={},
+            timestamp=base + timedelta(hours=index),
+        )
+        for index in range(4)
+    ]
+    window = (base, base + timedelta(days=1))
+    assert reader.count("shared", *window) == 0
+
+    # The first append to a new month writes its segment, then fails
+    # before the index records it; the retry must not keep both copies.
+    def fail(index):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(writer, "_write_index", fail)
+        with pytest.raises(OSError):
+            writer.append("shared", releases[:2])
+    assert writer.append("shared", releases[:2]) == ["0", "1"]
+    assert reader.count("shared", *window) == 2
+    assert [
+        record["deployment_id"] for record in reader.history("shared", *window)
+    ] == ["1", "0"]
+
+    # Bytes past the committed length (a member still being written, or
+    # left by a failed run) are never parsed and are replaced on append.
+    segment = tmp_path / "shared" / "2024-05.ndjson.gz"
+    with open(segment, "ab") as handle:
+        handle.write(b"\x1f\x8b partial")
+    assert len(reader.history("shared", *window)) == 2
+    assert writer.append("shared", releases[1:]) == ["2", "3"]
+    assert [
+        record["deployment_id"] for record in reader.history("shared", *window)
+    ] == ["3", "2", "1", "0"]
+
+
+def test_long_poll_replays_since_cursor(client):
+    base = datetime(2024, 10, 1, tzinfo=timezone.utc)
+    _seed_bundles("poll", [base + timedelta(hours=i) for i in range(3)])
+
+    resp = client.get(
+        "/api/v1/release/stream/poll/poll",
+        params={"since": base.isoformat(), "timeout": 0},
+        auth=auth(),
+    )
+    assert resp.status_code == 200
+    assert [item["versions"]["svc"] for item in resp.json()] == [
+        "0.0.1",
+        "0.0.2",
+    ]
+
+
+def test_long_poll_receives_new_release(client):
+    since = datetime.now(timezone.utc).isoformat()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(
+            client.get,
+            "/api/v1/release/stream/live/poll",
+            params={"since": since, "timeout": 10},
+            auth=auth(),
+        )
+        broadcaster = client.app.state.broadcaster
+        deadline = time.monotonic() + 10
+        while not broadcaster.subscriber_count("live"):
+            assert time.monotonic() < deadline, "long poll never subscribed"
+            time.sleep(0.01)
+        created = client.post(
+            "/api/v1/release/create",
+            json={"environment": "live", "versions": {"svc": "9.9.9"}},
+            auth=auth(),
+        )
+        resp = pending.result(timeout=15)
+    assert resp.status_code == 200
+    assert [item["deployment_id"] for item in resp.json()] == [
+        created.json()["deployment_id"]
+    ]
+
+
+def test_broadcaster_drops_slow_subscriber():
+    async def scenario():
+        broadcaster = ReleaseBroadcaster(queue_size=2)
+        subscription = broadcaster.subscribe("slow")
+        for index in range(3):
+            broadcaster.publish(
+                ReleaseOutput(
+                    deployment_id=str(index),
+                    environment="slow",
+                    versions={},
+                    timestamp=datetime.now(timezone.utc),
+                )
+            )
+        await asyncio.sleep(0)
+        received = [await subscription.get(1), await subscription.get(1)]
+        with pytest.raises(OverflowError):
+            await subscription.get(1)
+        return received
+
+    received = asyncio.run(scenario())
+    assert [release.deployment_id for release in received] == ["0", "1"]
+
+
+def test_bulk_import_ndjson_and_csv(tmp_path):
+    engine = db_session.create_db_engine(f"sqlite:///{tmp_path}/bulk.db")
+    versions = {"svc": "1.0.0"}
+    good_id = gen_release_bundle_hash("bulk", versions)
+    dump = tmp_path / "dump.ndjson"
+    dump.write_text(
+        "\n".join(
+            json.dumps(record)
+            for record in [
+                {
+                    "deployment_id": good_id,
+                    "environment": "bulk",
+                    "versions": versions,
+                    "timestamp": "2024-02-01T10:00:00+00:00",
+                },
+                {"environment": "bulk", "versions": versions},
+                {"deployment_id": "bogus", "environment": "bulk",
+                 "versions": {"svc": "2.0.0"}},
+                {"environment": "bulk", "versions": {"svc": "3.0.0"},
+                 "timestamp": "2024-02-02T10:00:00Z"},
+            ]
+        )
+        + "\n{not json\n"
+    )
+
+    bundle_logger = logging.getLogger("utils.bundle_id")
+    level = bundle_logger.level
+    stats = import_releases(engine, dump, chunk_size=2)
+    assert stats == {"read": 5, "inserted": 2, "skipped": 1, "rejected": 2}
+    assert bundle_logger.level == level
+    assert not (tmp_path / "dump.ndjson.import-state").exists()
+
+    csv_dump = tmp_path / "dump.csv"
+    csv_dump.write_text(
+        "environment,versions,timestamp\n"
+        'bulk,"{""svc"": ""4.0.0""}",2024-02-03T10:00:00Z\n'
+        'bulk,"{""svc"": ""3.0.0""}",2024-02-02T10:00:00Z\n'
+    )
+    stats = import_releases(engine, csv_dump, versions_storage="dedup")
+    assert stats["inserted"] == 1
+    assert stats["skipped"] == 1
+
+    with SQLSession(engine) as session:
+        bundles = session.exec(select(ReleaseBundle)).all()
+        assert len(bundles) == 3
+        assert {
+            release.versions["svc"]
+            for release in hydrate_releases(session, bundles)
+        } == {"1.0.0", "3.0.0", "4.0.0"}
+        rollup = session.exec(select(ReleaseDailyCount)).all()
+        assert sum(row.count for row in rollup) == 3
+
+
+def test_bulk_import_resumes_from_checkpoint(tmp_path):
+    engine = db_session.create_db_engine(f"sqlite:///{tmp_path}/resume.db")
+    dump = tmp_path / "dump.ndjson"
+    dump.write_text(
+        "".join(
+            json.dumps({"environment": "resume", "versions": {"svc": str(i)}})
+            + "\n"
+            for i in range(5)
+        )
+    )
+    (tmp_path / "dump.ndjson.import-state").write_text('{"records": 3}')
+
+    stats = import_releases(engine, dump, resume=True)
+    assert stats["read"] == 5
+    assert stats["inserted"] == 2
+
+
+def test_bulk_import_keeps_rollup_in_step_per_chunk(tmp_path, monkeypatch):
+    engine = db_session.create_db_engine(f"sqlite:///{tmp_path}/chunks.db")
+    dump = tmp_path / "dump.ndjson"
+    dump.write_text(
+        "".join(
+            json.dumps(
+                {
+                    "environment": "chunked",
+                    "versions": {"svc": str(i)},
+                    "timestamp": f"2024-04-0{1 + i % 3}T12:00:00Z",
+                }
+            )
+            + "\n"
+            for i in range(6)
+        )
+    )
+
+    def rollup_total():
+        with SQLSession(engine) as session:
+            rows = session.exec(select(ReleaseDailyCount)).all()
+            return sum(row.count for row in rows)
+
+    load = bulk_import._LOADERS["sqlite"]
+    calls = []
+
+    def fail_second_chunk(connection, rows):
+        calls.append(rows)
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        return load(connection, rows)
+
+    with monkeypatch.context() as patch:
+        patch.setitem(bulk_import._LOADERS, "sqlite", fail_second_chunk)
+        with pytest.raises(RuntimeError):
+            import_releases(engine, dump, chunk_size=4)
+    assert rollup_total() == 4
+
+    stats = import_releases(engine, dump, chunk_size=4, resume=True)
+    assert stats["inserted"] == 2
+    assert rollup_total() == 6
+
+
+def test_fast_start_skips_create_all_when_schema_is_current(
+    tmp_path, monkeypatch
+):
+    db_url = f"sqlite:///{tmp_path}/fast.db"
+    db_session.init_db(db_url)
+
+    calls = []
+    monkeypatch.setattr(
+        db_session.SQLModel.metadata,
+        "create_all",
+        lambda *args, **kwargs: calls.append(args),
+    )
+    db_session.init_db(db_url, fast_start=True)
+    assert calls == []
+
+    monkeypatch.setattr(db_session, "schema_fingerprint", lambda: "changed")
+    db_session.init_db(db_url, fast_start=True)
+    assert len(calls) == 1
+    db_session.prewarm_pool()
+
+
+def test_failed_prewarm_does_not_break_shutdown(test_settings, monkeypatch):
+    def unreachable(connections=None):
+        raise OSError("database unreachable")
+
+    monkeypatch.setattr(db_session, "prewarm_pool", unreachable)
+    test_settings.fast_start = True
+    with TestClient(create_app(test_settings)) as fast_client:
+        assert fast_client.get("/livez").status_code == 200
+
+
+def test_dedup_version_storage_round_trips(test_settings):
+    test_settings.versions_storage = "dedup"
+    app = create_app(test_settings)
+    with TestClient(app) as dedup_client:
+        shared = {f"service-{i}": "1.0.0" for i in range(5)}
+        created = []
+        for version in ("1.0.0", "1.0.1", "1.0.2"):
+            payload = {
+                "environment": "dedup",
+                "versions": {**shared, "service-0": version},
+            }
+            resp = dedup_client.post(
+                "/api/v1/release/create", json=payload, auth=auth()
+            )
+            assert resp.status_code == 200
+            assert resp.json()["versions"] == payload["versions"]
+            created.append(payload["versions"])
+
+        with SQLSession(db_session.engine) as session:
+            bundles = session.exec(select(ReleaseBundle)).all()
+            components = session.exec(select(ComponentVersion)).all()
+        assert all(bundle.versions is None for bundle in bundles)
+        assert len(components) == 7
+
+        start = datetime.now(timezone.utc) - timedelta(minutes=1)
+        end = datetime.now(timezone.utc) + timedelta(minutes=1)
+        history = dedup_client.get(
+            "/api/v1/release/history/dedup",
+            params={
+                "start_date": start.isoformat(),
+                "end_date": end.isoformat(),
+            },
+            auth=auth(),
+        )
+        assert sorted(
+            item["versions"]["service-0"] for item in history.json()
+        ) == ["1.0.0", "1.0.1", "1.0.2"]
+
+
+def test_convert_storage_between_modes(client):
+    _seed_bundles("convert", [datetime(2024, 4, 1, tzinfo=timezone.utc)] * 3)
+    with SQLSession(db_session.engine) as session:
+        before = hydrate_releases(
+            session, session.exec(select(ReleaseBundle)).all()
+        )
+        assert convert_storage(session, "dedup", chunk_size=2) == 3
+        bundles = session.exec(select(ReleaseBundle)).all()
+        assert all(bundle.component_ids for bundle in bundles)
+        assert hydrate_releases(session, bundles) == before
+
+        assert convert_storage(session, "inline") == 3
+        bundles = session.exec(select(ReleaseBundle)).all()
+        assert all(bundle.component_ids is None for bundle in bundles)
+        assert hydrate_releases(session, bundles) == before
+
+
+def test_component_cache_is_thread_safe():
+    cache = _ComponentCache(max_entries=8)
+
+    def churn(offset):
+        for index in range(2000):
+            component_id = (index + offset) % 32
+            cache.add(component_id, ("svc", str(component_id)))
+            cache.get((component_id + 1) % 32)
+            cache.id_for(("svc", str(component_id)))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for future in [pool.submit(churn, offset) for offset in range(8)]:
+            future.result()
+    assert len(cache._by_id) == len(cache._by_pair) == 8
+
+
+def test_history_response_compression(client):
+    base = datetime(2024, 11, 1, tzinfo=timezone.utc)
+    _seed_bundles("compress", [base + timedelta(hours=i) for i in range(30)])
+    window = {
+        "start_date": base.isoformat(),
+        "end_date": (base + timedelta(days=2)).isoformat(),
+    }
+    for accept, expected in (("gzip", "gzip"), ("br, gzip", "br")):
+        resp = client.get(
+            "/api/v1/release/history/compress",
+            params=window,
+            headers={"Accept-Encoding": accept},
+            auth=auth(),
+        )
+        assert resp.status_code == 200
+        assert resp.headers["content-encoding"] == expected
+        assert len(resp.json()) == 30
+
+    small = client.get("/livez", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_closed_window_history_snapshot_and_invalidation(client):
+    base = datetime(2024, 12, 1, tzinfo=timezone.utc)
+    _seed_bundles("snapshot", [base + timedelta(hours=i) for i in range(3)])
+    window = {
+        "start_date": base.isoformat(),
+        "end_date": (base + timedelta(days=1)).isoformat(),
+    }
+
+    def history():
+        return client.get(
+            "/api/v1/release/history/snapshot",
+            params=window,
+            headers={"Accept-Encoding": "gzip"},
+            auth=auth(),
+        ).json()
+
+    first = history()
+    assert len(first) == 3
+
+    # Written behind the API's back: the stored snapshot is still served.
+    with SQLSession(db_session.engine) as session:
+        versions = {"svc": "late"}
+        session.add(
+            ReleaseBundle(
+                deployment_id=gen_release_bundle_hash("snapshot", versions),
+                environment="snapshot",
+                versions=versions,
+                timestamp=base + timedelta(hours=5),
+            )
+        )
+        session.commit()
+    assert history() == first
+
+    deleted = client.delete(
+        f"/api/v1/release/delete/{first[0]['deployment_id']}", auth=auth()
+    )
+    assert deleted.status_code == 200
+    assert len(history()) == 3
+
+
+def test_history_snapshot_over_budget_is_not_stored(test_settings):
+    test_settings.history_snapshot_max_bytes = 50
+    with TestClient(create_app(test_settings)) as small_client:
+        base = datetime(2024, 12, 1, tzinfo=timezone.utc)
+        _seed_bundles("big", [base + timedelta(hours=i) for i in range(3)])
+        window = {
+            "start_date": base.isoformat(),
+            "end_date": (base + timedelta(days=1)).isoformat(),
+        }
+
+        def history():
+            resp = small_client.get(
+                "/api/v1/release/history/big", params=window, auth=auth()
+            )
+            assert resp.status_code == 200
+            return resp.json()
+
+        assert len(history()) == 3
+        # Not served from a snapshot: a row added behind the API's back
+        # shows up on the next request.
+        with SQLSession(db_session.engine) as session:
+            versions = {"svc": "late"}
+            session.add(
+                ReleaseBundle(
+                    deployment_id=gen_release_bundle_hash("big", versions),
+                    environment="big",
+                    versions=versions,
+                    timestamp=base + timedelta(hours=5),
+                )
+            )
+            session.commit()
+        assert len(history()) == 4
+
+
+def test_history_snapshot_requires_current_generation():
+    snapshots = HistorySnapshots(1024, minimum_size=1000, level=6)
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+    assert snapshots.put("race", start, end, b"[1]", "gzip", 1) == (
+        b"[1]",
+        "identity",
+    )
+    # A request that read the older generation before a delete committed
+    # must not replace the newer snapshot, or be served.
+    snapshots.put("race", start, end, b"[0]", None, 0)
+    assert snapshots.get("race", start, end, None, 1) == (b"[1]", "identity")
+    assert snapshots.get("race", start, end, None, 2) is None
+    assert snapshots.get("race", start, end, None, 1) is None
+
+
+def test_history_snapshots_invalidated_across_replicas(test_settings):
+    base = datetime(2024, 12, 1, tzinfo=timezone.utc)
+    window = {
+        "start_date": base.isoformat(),
+        "end_date": (base + timedelta(days=1)).isoformat(),
+    }
+    with TestClient(create_app(test_settings)) as first, TestClient(
+        create_app(test_settings)
+    ) as second:
+        _seed_bundles("shared", [base + timedelta(hours=i) for i in range(3)])
+
+        def history(replica):
+            return replica.get(
+                "/api/v1/release/history/shared", params=window, auth=auth()
+            ).json()
+
+        served = history(second)
+        assert len(served) == 3
+        deleted = first.delete(
+            f"/api/v1/release/delete/{served[0]['deployment_id']}",
+            auth=auth(),
+        )
+        assert deleted.status_code == 200
+        assert len(history(second)) == 2
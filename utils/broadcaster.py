@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import threading
+
+from prometheus_client import Counter, Gauge
+
+from models.release_output import ReleaseOutput
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+stream_connections = Gauge(
+    "release_stream_connections",
+    "Open release stream connections",
+    ["mode"],
+)
+stream_dropped_total = Counter(
+    "release_stream_dropped_total",
+    "Subscribers disconnected because they fell too far behind",
+)
+
+
+class Subscription:
+    def __init__(self, environment: str, queue_size: int):
+        self.environment = environment
+        self.queue: asyncio.Queue[ReleaseOutput] = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    async def get(self, timeout: float) -> ReleaseOutput | None:
+        """
+        Next release, or ``None`` after ``timeout`` seconds. Raises
+        ``OverflowError`` once a lagging subscriber has drained what it
+        was sent before being dropped.
+        """
+        if self.overflowed and self.queue.empty():
+            raise OverflowError("subscriber fell behind")
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ReleaseBroadcaster:
+    """
+    In-process fan-out of newly created releases to stream subscribers.
+    Each subscriber has a bounded queue; one that fills up is dropped
+    rather than slowing publishers or buffering without limit, and is
+    expected to reconnect with a ``since`` cursor to catch up from the
+    database.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def subscribe(self, environment: str) -> Subscription:
+        """Register a subscriber; must be called from the event loop."""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(environment, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(environment, set()).add(
+                subscription
+            )
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.environment)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.environment]
+
+    def subscriber_count(self, environment: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(environment, ()))
+
+    def publish(self, release: ReleaseOutput) -> None:
+        """Hand a committed release to subscribers; safe from any thread."""
+        with self._lock:
+            if not self._subscribers.get(release.environment):
+                return
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._deliver, release)
+
+    def _deliver(self, release: ReleaseOutput) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(release.environment, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(release)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self.unsubscribe(subscription)
+                stream_dropped_total.inc()
+                logger.warning(
+                    "dropped slow release stream subscriber",
+                    extra={"environment": release.environment},
+                )
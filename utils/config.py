@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -9,6 +10,20 @@ class Settings(BaseSettings):
     database_url: str = "sqlite:///./releasestore.db"
     logging_level: str = "INFO"
     sql_echo: bool = False
+    fast_start: bool = False
+    versions_storage: Literal["inline", "dedup"] = "inline"
+    delete_chunk_size: int = 1000
+    retention_days: dict[str, int] = {}
+    retention_interval_seconds: int = 3600
+    archive_dir: str | None = None
+    archive_writer: bool = True
+    archive_after_days: int = 30
+    archive_interval_seconds: int = 3600
+    stream_queue_size: int = 100
+    stream_keepalive_seconds: float = 15.0
+    compression_minimum_size: int = 1000
+    compression_level: int = 6
+    history_snapshot_max_bytes: int = 64 * 1024 * 1024
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
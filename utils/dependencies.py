@@ -3,7 +3,10 @@ import secrets
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 
+from database.archive import ReleaseArchive
+from utils.broadcaster import ReleaseBroadcaster
 from utils.config import Settings
+from utils.history_snapshots import HistorySnapshots
 
 security = HTTPBasic()
 
@@ -13,6 +16,18 @@ def get_app_settings(request: Request) -> Settings:
     return settings
 
 
+def get_archive(request: Request) -> ReleaseArchive | None:
+    return request.app.state.archive
+
+
+def get_broadcaster(request: Request) -> ReleaseBroadcaster:
+    return request.app.state.broadcaster
+
+
+def get_history_snapshots(request: Request) -> HistorySnapshots | None:
+    return request.app.state.history_snapshots
+
+
 def require_basic_auth(
     credentials: HTTPBasicCredentials = Depends(security),
     settings: Settings = Depends(get_app_settings),
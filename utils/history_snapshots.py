@@ -0,0 +1,173 @@
+from collections import OrderedDict
+from datetime import datetime, time, timezone
+import threading
+
+from starlette.responses import Response
+
+from utils.compression import compress
+
+IDENTITY = "identity"
+
+
+def _as_utc_naive(timestamp: datetime) -> datetime:
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+class _Snapshot:
+    def __init__(
+        self, environment: str, start: datetime, end: datetime, generation: int
+    ):
+        self.environment = environment
+        self.start = start
+        self.end = end
+        self.generation = generation
+        self.bodies: dict[str, bytes] = {}
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self.bodies.values())
+
+
+class HistorySnapshots:
+    """
+    Encoded ``/history`` responses for closed windows (ending before the
+    current UTC day), which only change when past releases are deleted or
+    imported. Bodies are kept per content coding so repeat requests skip
+    the query, the JSON encoding and the compression. Each entry carries
+    the environment's invalidation generation from the database, read
+    before its query; a snapshot is only served while that generation is
+    still current, so writes made through any replica invalidate it.
+    Entries are evicted LRU once ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, max_bytes: int, minimum_size: int, level: int):
+        self.max_bytes = max_bytes
+        self.minimum_size = minimum_size
+        self.level = level
+        self._entries: OrderedDict[tuple, _Snapshot] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_closed(end: datetime, now: datetime | None = None) -> bool:
+        now = now or datetime.now(timezone.utc)
+        today = datetime.combine(now.date(), time.min)
+        return _as_utc_naive(end) < today
+
+    @staticmethod
+    def _key(environment: str, start: datetime, end: datetime) -> tuple:
+        return environment, _as_utc_naive(start), _as_utc_naive(end)
+
+    def _remove(self, key: tuple) -> None:
+        snapshot = self._entries.pop(key, None)
+        if snapshot is not None:
+            self._size -= snapshot.size
+
+    def get(
+        self,
+        environment: str,
+        start: datetime,
+        end: datetime,
+        encoding: str | None,
+        generation: int,
+    ) -> tuple[bytes, str] | None:
+        """Stored body and its coding, compressing on first use per coding."""
+        key = self._key(environment, start, end)
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is None:
+                return None
+            if snapshot.generation != generation:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            identity = snapshot.bodies[IDENTITY]
+            if encoding is None or len(identity) < self.minimum_size:
+                return identity, IDENTITY
+            body = snapshot.bodies.get(encoding)
+        if body is not None:
+            return body, encoding
+
+        # Compress without the lock so other requests are not held up.
+        body = compress(identity, encoding, self.level)
+        with self._lock:
+            if (
+                self._entries.get(key) is snapshot
+                and encoding not in snapshot.bodies
+                and snapshot.size + len(body) <= self.max_bytes
+            ):
+                snapshot.bodies[encoding] = body
+                self._size += len(body)
+                self._entries.move_to_end(key)
+                self._evict()
+        return body, encoding
+
+    def put(
+        self,
+        environment: str,
+        start: datetime,
+        end: datetime,
+        body: bytes,
+        encoding: str | None,
+        generation: int,
+    ) -> tuple[bytes, str]:
+        """
+        Store ``body`` and return it encoded for ``encoding``. Nothing is
+        stored if the entry alone is larger than ``max_bytes`` or a newer
+        generation is already stored.
+        """
+        key = self._key(environment, start, end)
+        snapshot = _Snapshot(*key, generation)
+        snapshot.bodies[IDENTITY] = body
+        coding = IDENTITY
+        if encoding is not None and len(body) >= self.minimum_size:
+            coding = encoding
+            snapshot.bodies[coding] = compress(body, coding, self.level)
+        with self._lock:
+            previous = self._entries.get(key)
+            if snapshot.size <= self.max_bytes and (
+                previous is None or previous.generation <= generation
+            ):
+                self._remove(key)
+                self._entries[key] = snapshot
+                self._size += snapshot.size
+                self._evict()
+        return snapshot.bodies[coding], coding
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            _, snapshot = self._entries.popitem(last=False)
+            self._size -= snapshot.size
+
+    def invalidate(
+        self,
+        environment: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> None:
+        """
+        Drop an environment's snapshots overlapping ``[start, end]`` to
+        free their memory early; correctness comes from the generation.
+        """
+        start = _as_utc_naive(start) if start is not None else None
+        end = _as_utc_naive(end) if end is not None else None
+        with self._lock:
+            for key, snapshot in list(self._entries.items()):
+                if snapshot.environment != environment:
+                    continue
+                if start is not None and snapshot.end < start:
+                    continue
+                if end is not None and snapshot.start > end:
+                    continue
+                self._remove(key)
+
+    @staticmethod
+    def response(body: bytes, encoding: str) -> Response:
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding != IDENTITY:
+            headers["Content-Encoding"] = encoding
+        return Response(
+            content=body, media_type="application/json", headers=headers
+        )
@@ -15,7 +15,17 @@ class JsonFormatter(logging.Formatter):
             "message": record.getMessage(),
         }
 
-        for key in ("method", "path", "status_code", "process_ms"):
+        for key in (
+            "method",
+            "path",
+            "status_code",
+            "process_ms",
+            "read",
+            "inserted",
+            "skipped",
+            "rejected",
+            "rows_per_second",
+        ):
             if hasattr(record, key):
                 log_record[key] = getattr(record, key)
 